@@ -4,20 +4,86 @@
 # - PK dari pvkeys.txt
 # - Anti-salah paste RPC di prompt address
 # - snake_case raw_transaction
+# - Mode HD: HD_RANGE=0-999 → key diturunkan lazy dari mnemonic (BIP-44),
+#   gak perlu baca pvkeys.txt
+# - Index key→address (pvkeys.index.sqlite) supaya run ulang gak derive pubkey lagi
+# - SWEEP_CONCURRENCY=N → sweep paralel pakai AsyncWeb3 (N akun sekaligus),
+#   hasil dicetak begitu tiap akun selesai
+# - Prefetch balance + nonce pending semua akun via JSON-RPC batch; akun kosong/dust
+#   dibuang sebelum signing
+# - FeeOracle: baseFee/tip/gasPrice di-cache per block (TTL pendek), dipakai semua akun
+# - Tipe tx yang diterima node dicatat per RPC+chainId (txtype.cache.json);
+#   probe ulang cuma kalau tipe tercatat ditolak
+# - ConfirmationTracker: konfirmasi dicek per block baru (bukan per tx), jalan di thread
+#   sendiri; confirmed/dropped/timeout dicetak begitu terjadi
+# - Plan → broadcast: `autosend.py plan` sign semua tx paralel (process pool) ke
+#   sweep.plan.jsonl, `autosend.py broadcast` kirim raw tx dari plan tanpa sign ulang
 
+import asyncio
+import hashlib
+import hmac
+import json
 import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
-from web3 import Web3
+from web3 import AsyncHTTPProvider, AsyncWeb3, Web3
 from eth_account import Account
+from eth_account.hdaccount import seed_from_mnemonic
+from eth_account.hdaccount.deterministic import Node, SoftNode, derive_child_key
+from eth_keys.datatypes import PrivateKey
 from web3.middleware import ExtraDataToPOAMiddleware
 
 RPC_URL = os.getenv("RPC_URL") or "https://mars.rpc.movachain.com"
 PVKEY_FILE = Path("pvkeys.txt")
+TX_TYPE_FILE = Path("txtype.cache.json")        # tipe tx (legacy/1559) per RPC+chainId
+PLAN_FILE = Path("sweep.plan.jsonl")            # hasil `plan`: raw tx siap broadcast
+SIGN_WORKERS = os.cpu_count() or 1
+SIGN_CHUNK = 200                                # akun per task signing
+KEY_INDEX_FILE = Path("pvkeys.index.sqlite")   # cache fingerprint(key) → address
+INDEX_WORKERS = os.cpu_count() or 1
+INDEX_CHUNK = 1000                              # key per task saat rebuild paralel
+
+# Mode HD (sama dengan walletgen.py hd): index inklusif, mis. "0-999"
+HD_RANGE = os.getenv("HD_RANGE")
+HD_MNEMONIC = os.getenv("HD_MNEMONIC")     # kalau kosong, baca dari MNEMONIC_FILE
+MNEMONIC_FILE = Path("mnemonic.txt")
+HD_PATH = "m/44'/60'/0'/0/{}"
 
 GAS_LIMIT = 21_000
 EXTRA_BUFFER_WEI = 20_000_000_000_000  # ~0.00002 ETH
+RECEIPT_TIMEOUT = 180                  # detik sejak broadcast sebelum dianggap timeout/dropped
+CONFIRM_POLL_S = float(os.getenv("CONFIRM_POLL_S") or 2)   # interval cek block baru
+
+# 0 = sekuensial (perilaku lama); N > 0 = sweep async, N akun in-flight
+SWEEP_CONCURRENCY = int(os.getenv("SWEEP_CONCURRENCY") or 0)
+
+# Prefetch: jumlah call JSON-RPC per batch (2 call per akun: balance + nonce)
+PREFETCH_BATCH_SIZE = int(os.getenv("PREFETCH_BATCH_SIZE") or 200)
+# Balance <= ini dianggap dust (gak mungkin nutup buffer), langsung di-skip
+DUST_WEI = int(os.getenv("DUST_WEI") or EXTRA_BUFFER_WEI)
+
+# Fee dianggap masih valid selama ini (detik), lalu dicek ulang per block
+FEE_TTL_S = float(os.getenv("FEE_TTL_S") or 3)
+
+@dataclass
+class AccountSnap:
+    idx: int
+    pk: str
+    address: str
+    balance: int
+    nonce: int      # nonce "pending" saat prefetch
+
+def sweep_value(balance: int, max_fee: int, gas_price: int) -> int:
+    """Jumlah yang dikirim: balance - fee cap konservatif - buffer (<= 0 → skip)."""
+    return balance - GAS_LIMIT * int(max(max_fee, gas_price)) - EXTRA_BUFFER_WEI
 
 def connect() -> Web3:
     w3 = Web3(Web3.HTTPProvider(RPC_URL, request_kwargs={"timeout": 60}))
@@ -28,55 +94,317 @@ def connect() -> Web3:
         pass
     return w3
 
-def load_keys(path: Path):
+async def connect_async() -> AsyncWeb3:
+    w3 = AsyncWeb3(AsyncHTTPProvider(RPC_URL, request_kwargs={"timeout": 60}))
+    assert await w3.is_connected(), f"RPC gak connect: {RPC_URL}"
+    try:
+        w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
+    except Exception:
+        pass
+    return w3
+
+def is_valid_key(pk: str) -> bool:
+    """'0x' + 64 hex char."""
+    if len(pk) != 66:
+        return False
+    try:
+        bytes.fromhex(pk[2:])
+    except ValueError:
+        return False
+    return True
+
+def key_fingerprint(pk: str) -> bytes:
+    """Fingerprint pendek private key (index gak nyimpen key-nya sendiri)."""
+    return hashlib.sha256(bytes.fromhex(pk[2:])).digest()[:16]
+
+def derive_addresses(keys: List[str]) -> List[Optional[str]]:
+    """Worker: private key → checksum address (secp256k1 pubkey recovery);
+    None kalau key di luar range kurva."""
+    out: List[Optional[str]] = []
+    for pk in keys:
+        try:
+            out.append(Account.from_key(pk).address)
+        except Exception:
+            out.append(None)
+    return out
+
+def derive_addresses_parallel(keys: List[str]) -> List[Optional[str]]:
+    if len(keys) <= INDEX_CHUNK or INDEX_WORKERS <= 1:
+        return derive_addresses(keys)
+    chunks = [keys[i:i + INDEX_CHUNK] for i in range(0, len(keys), INDEX_CHUNK)]
+    out: List[Optional[str]] = []
+    with ProcessPoolExecutor(max_workers=INDEX_WORKERS) as ex:
+        for addrs in ex.map(derive_addresses, chunks):
+            out.extend(addrs)
+    return out
+
+def open_key_index(path: Path) -> sqlite3.Connection:
+    db = sqlite3.connect(str(path))
+    db.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT NOT NULL)")
+    db.execute("CREATE TABLE IF NOT EXISTS keys (fp BLOB PRIMARY KEY, address TEXT NOT NULL)")
+    return db
+
+def resolve_addresses(keys: List[str], src: Path) -> List[Optional[str]]:
+    """Address untuk tiap key lewat KEY_INDEX_FILE; di-rebuild paralel kalau
+    mtime/size pvkeys.txt beda dari yang tercatat. None = key gak valid."""
+    st = src.stat()
+    stamp = f"{st.st_mtime_ns}:{st.st_size}"
+    db = open_key_index(KEY_INDEX_FILE)
+    try:
+        row = db.execute("SELECT v FROM meta WHERE k = 'source'").fetchone()
+        known: Dict[bytes, Optional[str]] = {}
+        if row and row[0] == stamp:
+            # address "" = key tercatat gak valid (supaya gak di-derive ulang tiap run)
+            known = {fp: addr or None for fp, addr in db.execute("SELECT fp, address FROM keys")}
+        fps = [key_fingerprint(pk) for pk in keys]
+        missing = [i for i, fp in enumerate(fps) if fp not in known]
+        if missing:
+            print(f"[i] Key index: derive {len(missing)} address ...")
+            derived = derive_addresses_parallel([keys[i] for i in missing])
+            for i, addr in zip(missing, derived):
+                known[fps[i]] = addr
+            with db:
+                db.execute("DELETE FROM keys")
+                db.executemany("INSERT OR REPLACE INTO keys (fp, address) VALUES (?, ?)",
+                               [(fp, known[fp] or "") for fp in fps])
+                db.execute("INSERT OR REPLACE INTO meta (k, v) VALUES ('source', ?)", (stamp,))
+        return [known[fp] for fp in fps]
+    finally:
+        db.close()
+
+def load_keys(path: Path) -> List[Tuple[str, str]]:
+    """Return [(private_key, checksum_address)] dari pvkeys.txt (address via index)."""
     if not path.exists():
         raise FileNotFoundError(f"File {path} tidak ditemukan.")
-    keys = []
-    for line in path.read_text().splitlines():
+    keys, linenos = [], []
+    for lineno, line in enumerate(path.read_text().splitlines(), 1):
         s = line.strip()
         if not s or s.startswith("#"):
             continue
         if not s.startswith("0x"):
             s = "0x" + s
+        if not is_valid_key(s):
+            # satu baris rusak jangan sampai bikin seluruh sweep batal
+            print(f"[!] {path}:{lineno} bukan private key valid (64 hex), skip.")
+            continue
         keys.append(s)
-    if not keys:
-        raise RuntimeError("pvkeys.txt kosong.")
-    return keys
+        linenos.append(lineno)
+    pairs = []
+    for lineno, pk, addr in zip(linenos, keys, resolve_addresses(keys, path)):
+        if addr is None:
+            print(f"[!] {path}:{lineno} key di luar range secp256k1, skip.")
+            continue
+        pairs.append((pk, addr))
+    if not pairs:
+        raise RuntimeError("pvkeys.txt kosong (atau gak ada key valid).")
+    return pairs
 
-def guess_priority(w3: Web3) -> int:
-    try:
-        return int(w3.eth.max_priority_fee)  # bisa warning di beberapa node
-    except Exception:
-        return int(w3.to_wei("1", "gwei"))
+def parse_hd_range(spec: str) -> Tuple[int, int]:
+    """'100-199' → (100, 199) inklusif; '5' → (5, 5)."""
+    a, _, b = spec.strip().partition("-")
+    start, end = int(a), int(b or a)
+    if start < 0 or end < start or end >= 2**31:
+        raise ValueError(f"HD_RANGE invalid: {spec}")
+    return start, end
 
-def guess_eip1559_fees(w3: Web3) -> Tuple[int, int]:
-    """
-    Kembalikan (maxFeePerGas, maxPriorityFeePerGas) dalam wei.
-    Tidak bergantung pada fee_history (tapi pakai kalau ada).
-    """
-    prio = guess_priority(w3)
-    # Coba baseFee dari latest block
-    base_fee = None
-    try:
-        blk = w3.eth.get_block("latest")
-        base_fee = blk.get("baseFeePerGas", None)
-    except Exception:
-        pass
+SECP256K1_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+
+def hd_parent_node(seed: bytes) -> Tuple[bytes, bytes, bytes]:
+    """(key, chain_code, pubkey) node HD_PATH tanpa index terakhir (m/44'/60'/0'/0).
 
-    # Coba gas_price untuk batas konservatif
+    Diturunkan sekali per seed; per index tinggal satu langkah soft child."""
+    main = hmac.new(b"Bitcoin seed", seed, hashlib.sha512).digest()
+    key, chain_code = main[:32], main[32:]
+    for part in HD_PATH.rsplit("/", 1)[0].split("/")[1:]:
+        key, chain_code = derive_child_key(key, chain_code, Node.decode(part))
+    return key, chain_code, PrivateKey(key).public_key.to_compressed_bytes()
+
+def hd_child_key(parent: Tuple[bytes, bytes, bytes], index: int) -> bytes:
+    """Private key HD_PATH.format(index) dari node parent (BIP-32 CKDpriv, soft)."""
+    key, chain_code, pub = parent
+    i = hmac.new(chain_code, pub + index.to_bytes(4, "big"), hashlib.sha512).digest()
+    il = int.from_bytes(i[:32], "big")
+    k = (il + int.from_bytes(key, "big")) % SECP256K1_N
+    if il >= SECP256K1_N or k == 0:
+        # peluang < 2**-127; serahkan ke eth_account (lompat ke index berikutnya)
+        return derive_child_key(key, chain_code, SoftNode(index))[0]
+    return k.to_bytes(32, "big")
+
+def iter_hd_keys(start: int, end: int) -> Iterator[Tuple[str, str]]:
+    """(private_key, address) index start..end (inklusif), diturunkan satu per satu saat dipakai."""
+    words = HD_MNEMONIC
+    if not words:
+        if not MNEMONIC_FILE.exists():
+            raise FileNotFoundError(f"File {MNEMONIC_FILE} tidak ditemukan (atau set HD_MNEMONIC).")
+        words = MNEMONIC_FILE.read_text().strip()
+    parent = hd_parent_node(seed_from_mnemonic(words, ""))  # PBKDF2 + 4 level cukup sekali
+    for i in range(start, end + 1):
+        pk = "0x" + hd_child_key(parent, i).hex()
+        yield pk, Account.from_key(pk).address
+
+def fetch_chunk(w3: Web3, chunk: List[Tuple[int, str, str]]) -> List[Tuple[int, int]]:
+    """[(balance, nonce)] untuk satu chunk; satu batch request, fallback per-call
+    kalau node gak dukung batch."""
     try:
-        gp = int(w3.eth.gas_price)
-    except Exception:
-        gp = int(w3.to_wei("3", "gwei"))
+        with w3.batch_requests() as batch:
+            for _, _, addr in chunk:
+                batch.add(w3.eth.get_balance(addr))
+                batch.add(w3.eth.get_transaction_count(addr, "pending"))
+            res = batch.execute()
+        if len(res) != 2 * len(chunk):
+            raise RuntimeError(f"batch reply {len(res)} != {2 * len(chunk)}")
+        return [(int(res[2 * i]), int(res[2 * i + 1])) for i in range(len(chunk))]
+    except Exception as e:
+        print(f"[!] Batch gagal ({e}), fallback per-call untuk {len(chunk)} akun")
+        return [(int(w3.eth.get_balance(addr)), int(w3.eth.get_transaction_count(addr, "pending")))
+                for _, _, addr in chunk]
+
+def prefetch_accounts(w3: Web3, keys: Iterable[Tuple[str, str]], first_idx: int) -> List[AccountSnap]:
+    """Snapshot balance + nonce semua akun (batch per PREFETCH_BATCH_SIZE call),
+    akun dengan balance <= DUST_WEI dibuang."""
+    per_batch = max(1, PREFETCH_BATCH_SIZE // 2)
+    out: List[AccountSnap] = []
+    total = dropped = 0
+    chunk: List[Tuple[int, str, str]] = []
+
+    def flush():
+        nonlocal dropped
+        for (idx, pk, addr), (bal, nonce) in zip(chunk, fetch_chunk(w3, chunk)):
+            if bal <= DUST_WEI:
+                dropped += 1
+                continue
+            out.append(AccountSnap(idx, pk, addr, bal, nonce))
+        chunk.clear()
+
+    for idx, (pk, addr) in enumerate(keys, first_idx):
+        chunk.append((idx, pk, addr))
+        total += 1
+        if len(chunk) >= per_batch:
+            flush()
+    if chunk:
+        flush()
+    print(f"[i] Prefetch: {total} akun, {dropped} kosong/dust di-skip, {len(out)} diproses")
+    return out
 
+GWEI = 1_000_000_000
+
+@dataclass
+class FeeQuote:
+    block: Optional[int]
+    base_fee: Optional[int]
+    prio: int
+    gas_price: int
+    max_fee: int
+    fetched_at: float
+
+def eip1559_max_fee(base_fee: Optional[int], prio: int, gp: int) -> int:
+    """maxFeePerGas konservatif: 2×baseFee + tip (atau 2×gasPrice kalau gak ada baseFee)."""
     if isinstance(base_fee, int):
         max_fee = max(int(base_fee * 2 + prio), gp)
     else:
-        max_fee = max(int(gp * 2 + prio), int(w3.to_wei("3", "gwei")))
-
+        max_fee = max(int(gp * 2 + prio), 3 * GWEI)
     if max_fee <= prio:
-        max_fee = prio + int(w3.to_wei("1", "gwei"))
-    return int(max_fee), int(prio)
+        max_fee = prio + 1 * GWEI
+    return int(max_fee)
+
+def _hex_int(v) -> Optional[int]:
+    if v is None:
+        return None
+    return int(v, 16) if isinstance(v, str) else int(v)
+
+class FeeOracle:
+    """
+    Cache fee per block, dipakai bareng semua akun dalam satu run.
+    - Dalam FEE_TTL_S: langsung pakai quote terakhir (0 RPC)
+    - Lewat TTL: ambil header latest; kalau nomor block sama cukup perpanjang TTL,
+      kalau block baru baru ambil tip + gasPrice
+    - Header via eth_getHeaderByNumber (tanpa list tx); node yang gak dukung
+      otomatis pindah ke get_block(full_transactions=False)
+    """
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.quote: Optional[FeeQuote] = None
+        self.header_rpc = True
+        self._alock: Optional[asyncio.Lock] = None
+
+    def _fresh(self) -> bool:
+        return self.quote is not None and time.monotonic() - self.quote.fetched_at < self.ttl
+
+    def _same_block(self, number: Optional[int]) -> bool:
+        if self.quote is None or number is None or self.quote.block != number:
+            return False
+        self.quote.fetched_at = time.monotonic()
+        return True
+
+    def _store(self, number, base_fee, prio, gp) -> FeeQuote:
+        self.quote = FeeQuote(number, base_fee, prio, gp, eip1559_max_fee(base_fee, prio, gp),
+                              time.monotonic())
+        return self.quote
+
+    def _header(self, w3: Web3) -> Tuple[Optional[int], Optional[int]]:
+        if self.header_rpc:
+            try:
+                h = w3.manager.request_blocking("eth_getHeaderByNumber", ["latest"])
+                return _hex_int(h.get("number")), _hex_int(h.get("baseFeePerGas"))
+            except Exception:
+                self.header_rpc = False
+        try:
+            blk = w3.eth.get_block("latest", full_transactions=False)
+            return blk.get("number"), blk.get("baseFeePerGas")
+        except Exception:
+            return None, None
+
+    def get(self, w3: Web3) -> FeeQuote:
+        if self._fresh():
+            return self.quote
+        number, base_fee = self._header(w3)
+        if self._same_block(number):
+            return self.quote
+        try:
+            prio = int(w3.eth.max_priority_fee)  # bisa warning di beberapa node
+        except Exception:
+            prio = 1 * GWEI
+        try:
+            gp = int(w3.eth.gas_price)
+        except Exception:
+            gp = 3 * GWEI
+        return self._store(number, base_fee, prio, gp)
+
+    async def _header_async(self, w3: AsyncWeb3) -> Tuple[Optional[int], Optional[int]]:
+        if self.header_rpc:
+            try:
+                h = await w3.manager.coro_request("eth_getHeaderByNumber", ["latest"])
+                return _hex_int(h.get("number")), _hex_int(h.get("baseFeePerGas"))
+            except Exception:
+                self.header_rpc = False
+        try:
+            blk = await w3.eth.get_block("latest", full_transactions=False)
+            return blk.get("number"), blk.get("baseFeePerGas")
+        except Exception:
+            return None, None
+
+    async def get_async(self, w3: AsyncWeb3) -> FeeQuote:
+        if self._fresh():
+            return self.quote
+        if self._alock is None:
+            self._alock = asyncio.Lock()
+        async with self._alock:  # banyak worker kedaluwarsa bareng → cukup satu yang refresh
+            if self._fresh():
+                return self.quote
+            number, base_fee = await self._header_async(w3)
+            if self._same_block(number):
+                return self.quote
+            try:
+                prio = int(await w3.eth.max_priority_fee)
+            except Exception:
+                prio = 1 * GWEI
+            try:
+                gp = int(await w3.eth.gas_price)
+            except Exception:
+                gp = 3 * GWEI
+            return self._store(number, base_fee, prio, gp)
+
+FEE_ORACLE = FeeOracle(FEE_TTL_S)
 
 def ask_recipient_and_maybe_set_rpc() -> str:
     global RPC_URL
@@ -91,7 +419,7 @@ def ask_recipient_and_maybe_set_rpc() -> str:
         raise ValueError(f"Recipient must be a valid 0x address. Got: {addr}")
     return Web3.to_checksum_address(addr)
 
-def pretty_eth(w3: Web3, wei: int) -> str:
+def pretty_eth(w3, wei: int) -> str:
     try:
         return f"{w3.from_wei(wei, 'ether')} ETH"
     except Exception:
@@ -123,80 +451,427 @@ def build_eip1559_tx(acct_addr: str, to: str, value: int, nonce: int, chain_id:
         "maxPriorityFeePerGas": int(max_prio),
     }
 
-def send_with_strategy(w3: Web3, acct: Account, to: str, send_value: int, chain_id: int):
+# indikasi node menolak legacy / decoding legacy gagal / butuh typed
+NEED_1559_HINTS = ("eip-1559", "1559", "maxfeepergas", "maxpriorityfeepergas",
+                   "unknown transaction type", "rlp decode failed")
+# indikasi node gak kenal typed tx (chain lama / pre-London)
+NEED_LEGACY_HINTS = ("transaction type not supported", "tx type not supported",
+                     "unknown transaction type", "typed transaction", "rlp decode failed",
+                     "london", "eip-2718")
+
+TX_TYPES = ("legacy", "1559")
+
+class TxTypeCache:
+    """Tipe tx yang diterima per (RPC_URL, chainId), disimpan di TX_TYPE_FILE supaya
+    run berikutnya langsung pakai tipe yang benar tanpa kirim-gagal dulu."""
+    def __init__(self, path: Path):
+        self.path = path
+        self.data: Dict[str, str] = {}
+        self._alock: Optional[asyncio.Lock] = None
+        try:
+            self.data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def key(chain_id: int) -> str:
+        return f"{RPC_URL}|{chain_id}"
+
+    def get(self, chain_id: int) -> Optional[str]:
+        kind = self.data.get(self.key(chain_id))
+        return kind if kind in TX_TYPES else None
+
+    def set(self, chain_id: int, kind: str):
+        if self.data.get(self.key(chain_id)) == kind:
+            return
+        self.data[self.key(chain_id)] = kind
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        try:
+            tmp.write_text(json.dumps(self.data, indent=2))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[!] Gagal simpan {self.path}: {e}")
+
+    def probe_lock(self) -> asyncio.Lock:
+        if self._alock is None:
+            self._alock = asyncio.Lock()
+        return self._alock
+
+TX_TYPE_CACHE = TxTypeCache(TX_TYPE_FILE)
+
+def type_rejected(kind: str, err: Exception) -> bool:
+    hints = NEED_1559_HINTS if kind == "legacy" else NEED_LEGACY_HINTS
+    return any(h in str(err).lower() for h in hints)
+
+def sign_tx(acct: Account, kind: str, to: str, value: int, nonce: int, chain_id: int, fee: FeeQuote) -> bytes:
+    if kind == "legacy":
+        tx = build_legacy_tx(acct.address, to, value, nonce, chain_id, fee.gas_price)
+    else:
+        tx = build_eip1559_tx(acct.address, to, value, nonce, chain_id, fee.max_fee, fee.prio)
+    return acct.sign_transaction(tx).raw_transaction
+
+def send_with_strategy(w3: Web3, acct: Account, to: str, send_value: int, chain_id: int, nonce: int):
     """
-    1) Coba legacy (tanpa 'type').
-    2) Jika ditolak (unknown type / butuh 1559 / rlp decode), fallback ke type-2.
+    1) Pakai tipe tx yang sudah tercatat untuk chain ini (default: legacy dulu).
+    2) Jika ditolak karena tipenya (unknown type / butuh 1559 / rlp decode), probe ulang
+       pakai tipe satunya; tipe yang berhasil dicatat di TX_TYPE_CACHE.
     """
-    nonce = w3.eth.get_transaction_count(acct.address, "pending")
-
-    # LEGACY attempt
+    first = TX_TYPE_CACHE.get(chain_id) or "legacy"
     try:
-        try:
-            gp = int(w3.eth.gas_price)
-        except Exception:
-            gp = int(w3.to_wei("3", "gwei"))
-        tx_legacy = build_legacy_tx(acct.address, to, send_value, nonce, chain_id, gp)
-        signed_legacy = acct.sign_transaction(tx_legacy)
-        return w3.eth.send_raw_transaction(signed_legacy.raw_transaction)
+        tx_hash = w3.eth.send_raw_transaction(
+            sign_tx(acct, first, to, send_value, nonce, chain_id, FEE_ORACLE.get(w3)))
+        TX_TYPE_CACHE.set(chain_id, first)
+        return tx_hash
     except Exception as e1:
-        msg = str(e1)
-        # indikasi node menolak legacy / decoding legacy gagal / butuh typed
-        need_1559 = any(s in msg.lower() for s in [
-            "eip-1559", "1559", "maxfeepergas", "maxpriorityfeepergas",
-            "unknown transaction type", "rlp decode failed"
-        ])
-        if not need_1559:
+        if not type_rejected(first, e1):
             # kalau error lain, lepasin
             raise
 
-    # Fallback: TYPE-2
-    mf, pr = guess_eip1559_fees(w3)
-    tx_1559 = build_eip1559_tx(acct.address, to, send_value, nonce, chain_id, mf, pr)
-    signed_1559 = acct.sign_transaction(tx_1559)
-    return w3.eth.send_raw_transaction(signed_1559.raw_transaction)
+    other = TX_TYPES[1 - TX_TYPES.index(first)]
+    print(f"[i] Tx {first} ditolak node, pindah ke {other}")
+    tx_hash = w3.eth.send_raw_transaction(
+        sign_tx(acct, other, to, send_value, nonce, chain_id, FEE_ORACLE.get(w3)))
+    TX_TYPE_CACHE.set(chain_id, other)
+    return tx_hash
+
+async def _send_kind_async(w3: AsyncWeb3, acct: Account, kind: str, to: str, send_value: int,
+                           chain_id: int, nonce: int):
+    fee = await FEE_ORACLE.get_async(w3)
+    return await w3.eth.send_raw_transaction(sign_tx(acct, kind, to, send_value, nonce, chain_id, fee))
+
+async def _probe_send_async(w3: AsyncWeb3, acct: Account, first: str, to: str, send_value: int,
+                            chain_id: int, nonce: int):
+    try:
+        tx_hash = await _send_kind_async(w3, acct, first, to, send_value, chain_id, nonce)
+        TX_TYPE_CACHE.set(chain_id, first)
+        return tx_hash
+    except Exception as e1:
+        if not type_rejected(first, e1):
+            raise
+
+    other = TX_TYPES[1 - TX_TYPES.index(first)]
+    print(f"[i] Tx {first} ditolak node, pindah ke {other}")
+    tx_hash = await _send_kind_async(w3, acct, other, to, send_value, chain_id, nonce)
+    TX_TYPE_CACHE.set(chain_id, other)
+    return tx_hash
+
+async def send_with_strategy_async(w3: AsyncWeb3, acct: Account, to: str, send_value: int,
+                                   chain_id: int, nonce: int):
+    """Versi async send_with_strategy. Selama tipe belum tercatat, probe dijalankan satu
+    worker saja (yang lain nunggu hasilnya) supaya gak semua akun kirim-gagal bareng."""
+    first = TX_TYPE_CACHE.get(chain_id)
+    if first is None:
+        async with TX_TYPE_CACHE.probe_lock():
+            first = TX_TYPE_CACHE.get(chain_id)
+            if first is None:
+                return await _probe_send_async(w3, acct, "legacy", to, send_value, chain_id, nonce)
+    return await _probe_send_async(w3, acct, first, to, send_value, chain_id, nonce)
+
+@dataclass
+class Pending:
+    label: str
+    sender: str
+    nonce: int
+    sent_at: float
+
+class ConfirmationTracker:
+    """
+    Thread yang mengawasi semua tx yang sudah di-broadcast sekaligus.
+    - submit() gak nge-block: cuma catat hash
+    - Tiap CONFIRM_POLL_S cek eth_blockNumber; tiap block baru diambil sekali
+      (hash tx saja) dan dicocokkan ke semua hash pending
+    - Lewat RECEIPT_TIMEOUT: cek receipt/tx sekali → confirmed, dropped
+      (gak dikenal node / nonce sudah kepakai tx lain) atau timeout
+    RPC ∝ jumlah block, bukan jumlah tx × interval poll.
+    """
+    RECENT_BLOCKS = 4   # hash block terakhir disimpan untuk tx yang keburu mined sebelum submit()
+
+    def __init__(self, w3: Web3, timeout: float = RECEIPT_TIMEOUT, poll_s: float = CONFIRM_POLL_S):
+        self.w3 = w3
+        self.timeout = timeout
+        self.poll_s = poll_s
+        self.pending: Dict[bytes, Pending] = {}
+        self.recent: deque = deque(maxlen=self.RECENT_BLOCKS)   # (block, set(hash))
+        self.counts = {"confirmed": 0, "dropped": 0, "timeout": 0}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = False
+        self.last_block: Optional[int] = None
+        self.thread = threading.Thread(target=self._run, name="confirm-tracker", daemon=True)
+        self.thread.start()
+
+    def submit(self, tx_hash, label: str, sender: str, nonce: int):
+        h = bytes(tx_hash)
+        with self.lock:
+            for number, hashes in self.recent:
+                if h in hashes:
+                    self._report("confirmed", h, Pending(label, sender, nonce, time.monotonic()), number)
+                    return
+            self.pending[h] = Pending(label, sender, nonce, time.monotonic())
+
+    def _report(self, kind: str, h: bytes, p: Pending, block: Optional[int] = None, note: str = ""):
+        self.counts[kind] += 1
+        waited = time.monotonic() - p.sent_at
+        where = f" block {block}" if block is not None else ""
+        print(f"{p.label} {kind}{where} ({waited:.0f}s) tx 0x{h.hex()}{note}")
+
+    def _scan_blocks(self):
+        head = int(self.w3.eth.block_number)
+        if self.last_block is None:
+            self.last_block = head - 1
+        for n in range(self.last_block + 1, head + 1):
+            blk = self.w3.eth.get_block(n, full_transactions=False)
+            hashes = {bytes(t) for t in blk.get("transactions", [])}
+            with self.lock:
+                self.recent.append((n, hashes))
+                for h in hashes & self.pending.keys():
+                    self._report("confirmed", h, self.pending.pop(h), n)
+            self.last_block = n
+
+    def _expire(self):
+        now = time.monotonic()
+        with self.lock:
+            old = [(h, p) for h, p in self.pending.items() if now - p.sent_at >= self.timeout]
+        for h, p in old:
+            kind, block, note = "timeout", None, ""
+            try:
+                rcpt = self.w3.eth.get_transaction_receipt(h)
+                kind, block = "confirmed", rcpt.get("blockNumber")
+            except Exception:
+                try:
+                    if int(self.w3.eth.get_transaction_count(p.sender, "latest")) > p.nonce:
+                        kind, note = "dropped", " (nonce sudah dipakai tx lain)"
+                    else:
+                        self.w3.eth.get_transaction(h)   # masih di mempool → timeout
+                except Exception:
+                    kind, note = "dropped", " (gak dikenal node)"
+            with self.lock:
+                if self.pending.pop(h, None) is not None:
+                    self._report(kind, h, p, block, note)
+
+    def _run(self):
+        while True:
+            try:
+                self._scan_blocks()
+            except Exception as e:
+                print(f"[!] Tracker: {e}")
+            try:
+                # terpisah dari scan: RPC block mati pun timeout tetap jalan
+                self._expire()
+            except Exception as e:
+                print(f"[!] Tracker expire: {e}")
+            with self.lock:
+                if self.stopping and not self.pending:
+                    return
+            self.wake.wait(self.poll_s)
+            self.wake.clear()
+
+    def drain(self):
+        """Tunggu sampai semua tx pending selesai (confirmed/dropped/timeout), lalu stop."""
+        with self.lock:
+            self.stopping = True
+            n = len(self.pending)
+        self.wake.set()
+        if n:
+            print(f"[i] Menunggu konfirmasi {n} tx ...")
+        self.thread.join()
+        c = self.counts
+        print(f"[i] Selesai: {c['confirmed']} confirmed, {c['dropped']} dropped, {c['timeout']} timeout")
+
+async def sweep_one_async(w3: AsyncWeb3, snap: AccountSnap, to: str, chain_id: int,
+                          tracker: ConfirmationTracker):
+    """Satu akun di mode async; output diberi prefix #idx karena baris antar akun bisa selang-seling."""
+    tag = f"[#{snap.idx} {snap.address[:10]}]"
+    try:
+        bal = snap.balance
+        fee = await FEE_ORACLE.get_async(w3)
+        send_value = sweep_value(bal, fee.max_fee, fee.gas_price)
+        if send_value <= 0:
+            print(f"{tag} balance {pretty_eth(w3, bal)} tidak cukup setelah fee cap, skip.")
+            return
+
+        acct = Account.from_key(snap.pk)
+        tx_hash = await send_with_strategy_async(w3, acct, to, int(send_value), chain_id, snap.nonce)
+        print(f"{tag} sent {pretty_eth(w3, int(send_value))} → {to}  tx {tx_hash.hex()}")
+        tracker.submit(tx_hash, tag, snap.address, snap.nonce)
+    except Exception as e:
+        print(f"{tag} [ERROR] {e}")
+
+async def sweep_async(accounts: List[AccountSnap], to: str, chain_id: int, concurrency: int,
+                      tracker: ConfirmationTracker):
+    """N worker menarik akun dari iterator yang sama → paling banyak N akun in-flight;
+    konfirmasi diurus tracker jadi worker langsung lanjut ke akun berikutnya."""
+    w3 = await connect_async()
+    print(f"[i] Connected (async). concurrency={concurrency}")
+    it = iter(accounts)
+
+    async def worker():
+        for snap in it:  # event loop single-thread → next() aman dibagi
+            await sweep_one_async(w3, snap, to, chain_id, tracker)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        try:
+            await w3.provider.disconnect()
+        except Exception:
+            pass
+
+def sign_plan_chunk(job: Tuple[List[Tuple[int, str, str, int, int]], str, int, FeeQuote, List[str]]) -> List[dict]:
+    """Worker: sign satu chunk akun → baris plan. kinds[0] = tipe utama; kalau tipe chain
+    belum diketahui, kinds[1] ikut di-sign sebagai cadangan untuk broadcast."""
+    items, to, chain_id, fee, kinds = job
+    out = []
+    for idx, pk, address, nonce, value in items:
+        acct = Account.from_key(pk)
+        row = {"idx": idx, "from": address, "nonce": nonce, "value": value, "type": kinds[0],
+               "raw": "0x" + bytes(sign_tx(acct, kinds[0], to, value, nonce, chain_id, fee)).hex()}
+        if len(kinds) > 1:
+            row["alt_type"] = kinds[1]
+            row["alt_raw"] = "0x" + bytes(sign_tx(acct, kinds[1], to, value, nonce, chain_id, fee)).hex()
+        out.append(row)
+    return out
+
+def plan_main():
+    """Stage 1: prefetch + fee + tipe tx → sign semua tx paralel → PLAN_FILE."""
+    to = ask_recipient_and_maybe_set_rpc()
+    if HD_RANGE:
+        hd_start, hd_end = parse_hd_range(HD_RANGE)
+        keys, first_idx = iter_hd_keys(hd_start, hd_end), hd_start
+    else:
+        keys, first_idx = load_keys(PVKEY_FILE), 1
+
+    w3 = connect()
+    chain_id = w3.eth.chain_id
+    accounts = prefetch_accounts(w3, keys, first_idx)
+    fee = FEE_ORACLE.get(w3)
+    known = TX_TYPE_CACHE.get(chain_id)
+    kinds = [known] if known else ["legacy", "1559"]
+    if not known:
+        print("[i] Tipe tx chain ini belum diketahui → sign legacy + cadangan type-2")
+
+    items = []
+    for snap in accounts:
+        value = sweep_value(snap.balance, fee.max_fee, fee.gas_price)
+        if value > 0:
+            items.append((snap.idx, snap.pk, snap.address, snap.nonce, int(value)))
+    chunks = [items[i:i + SIGN_CHUNK] for i in range(0, len(items), SIGN_CHUNK)]
+    jobs = [(c, to, chain_id, fee, kinds) for c in chunks]
+
+    t0 = time.time()
+    tmp = PLAN_FILE.with_suffix(PLAN_FILE.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        meta = {"rpc": RPC_URL, "chain_id": chain_id, "to": to, "block": fee.block,
+                "max_fee": fee.max_fee, "prio": fee.prio, "gas_price": fee.gas_price,
+                "created": int(time.time())}
+        f.write(json.dumps({"meta": meta}) + "\n")
+        if len(jobs) <= 1 or SIGN_WORKERS <= 1:
+            for rows in map(sign_plan_chunk, jobs):
+                f.write("".join(json.dumps(r) + "\n" for r in rows))
+        else:
+            with ProcessPoolExecutor(max_workers=SIGN_WORKERS) as ex:
+                for rows in ex.map(sign_plan_chunk, jobs):
+                    f.write("".join(json.dumps(r) + "\n" for r in rows))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, PLAN_FILE)
+    print(f"[i] Plan: {len(items)} tx di-sign dalam {time.time() - t0:.1f}s → {PLAN_FILE} "
+          f"({len(accounts) - len(items)} akun gak cukup setelah fee cap)")
+
+def broadcast_main(path: Path):
+    """Stage 2: kirim raw tx dari plan apa adanya (tanpa key / sign ulang)."""
+    global RPC_URL
+    lines = path.read_text(encoding="utf-8").splitlines()
+    if not lines:
+        raise RuntimeError(f"{path} kosong.")
+    meta = json.loads(lines[0])["meta"]
+    RPC_URL = os.getenv("RPC_URL") or meta["rpc"]
+    w3 = connect()
+    chain_id = w3.eth.chain_id
+    if chain_id != meta["chain_id"]:
+        raise RuntimeError(f"chainId RPC {chain_id} != plan {meta['chain_id']}")
+    age = time.time() - meta["created"]
+    print(f"[i] Broadcast {len(lines) - 1} tx dari {path} (plan umur {age:.0f}s, fee dari block {meta['block']})")
+
+    tracker = ConfirmationTracker(connect())
+    for line in lines[1:]:
+        row = json.loads(line)
+        tag = f"[#{row['idx']} {row['from'][:10]}]"
+        variants = [(row["type"], row["raw"])]
+        if "alt_raw" in row:
+            variants.append((row["alt_type"], row["alt_raw"]))
+            if TX_TYPE_CACHE.get(chain_id) == row["alt_type"]:  # sudah ketahuan di baris sebelumnya
+                variants.reverse()
+        try:
+            try:
+                tx_hash = w3.eth.send_raw_transaction(variants[0][1])
+                TX_TYPE_CACHE.set(chain_id, variants[0][0])
+            except Exception as e1:
+                if len(variants) < 2 or not type_rejected(variants[0][0], e1):
+                    raise
+                tx_hash = w3.eth.send_raw_transaction(variants[1][1])
+                TX_TYPE_CACHE.set(chain_id, variants[1][0])
+            print(f"{tag} sent {pretty_eth(w3, row['value'])}  tx {tx_hash.hex()}")
+            tracker.submit(tx_hash, tag, row["from"], row["nonce"])
+        except Exception as e:
+            print(f"{tag} [ERROR] {e}")
+    tracker.drain()
 
 def main():
     to = ask_recipient_and_maybe_set_rpc()
+
+    if HD_RANGE:
+        hd_start, hd_end = parse_hd_range(HD_RANGE)
+        print(f"[i] HD mode: index {hd_start}..{hd_end}")
+        keys, first_idx = iter_hd_keys(hd_start, hd_end), hd_start
+    else:
+        keys, first_idx = load_keys(PVKEY_FILE), 1
+
     w3 = connect()
     chain_id = w3.eth.chain_id
     print(f"[i] Connected. chainId={chain_id}")
+    accounts = prefetch_accounts(w3, keys, first_idx)
+    # w3 sync milik tracker sendiri (thread terpisah)
+    tracker = ConfirmationTracker(connect())
 
-    keys = load_keys(PVKEY_FILE)
+    if SWEEP_CONCURRENCY > 0:
+        asyncio.run(sweep_async(accounts, to, chain_id, SWEEP_CONCURRENCY, tracker))
+        tracker.drain()
+        return
 
-    for idx, pk in enumerate(keys, 1):
-        print(f"\n=== Account #{idx} ===")
+    for snap in accounts:
+        print(f"\n=== Account #{snap.idx} ===")
         try:
-            acct = Account.from_key(pk)
-            bal = w3.eth.get_balance(acct.address)
-            print(f"Sender: {acct.address}")
+            bal = snap.balance
+            print(f"Sender: {snap.address}")
             print(f"Sender balance: {pretty_eth(w3, bal)}")
 
             # Estimasi biaya maksimum konservatif (pakai cap agar ga habis total)
-            mf, pr = guess_eip1559_fees(w3)
-            fee_cap = GAS_LIMIT * int(max(mf, int(w3.eth.gas_price) if hasattr(w3.eth, "gas_price") else mf))
-
-            send_value = bal - fee_cap - EXTRA_BUFFER_WEI
+            fee = FEE_ORACLE.get(w3)
+            send_value = sweep_value(bal, fee.max_fee, fee.gas_price)
             if send_value <= 0:
                 print("Balance tidak cukup setelah fee cap, skip.")
                 continue
 
             print(f"Processing send {pretty_eth(w3, int(send_value))} → {to}")
 
-            tx_hash = send_with_strategy(w3, acct, to, int(send_value), chain_id)
+            acct = Account.from_key(snap.pk)  # baru derive kalau memang mau sign
+            tx_hash = send_with_strategy(w3, acct, to, int(send_value), chain_id, snap.nonce)
             print("TX sent:", tx_hash.hex())
-
-            try:
-                rcpt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=180)
-                print(f"Mined in block {rcpt.blockNumber}")
-            except Exception as e:
-                print(f"Broadcasted, menunggu konfirmasi: {e}")
+            tracker.submit(tx_hash, f"[#{snap.idx} {snap.address[:10]}]", snap.address, snap.nonce)
 
         except Exception as e:
             print(f"[ERROR] {e}")
 
+    tracker.drain()
+
 if __name__ == "__main__":
     try:
-        main()
+        if sys.argv[1:2] == ["plan"]:
+            plan_main()
+        elif sys.argv[1:2] == ["broadcast"]:
+            broadcast_main(Path(sys.argv[2]) if len(sys.argv) > 2 else PLAN_FILE)
+        else:
+            main()
     except Exception as e:
         print("Error:", repr(e))
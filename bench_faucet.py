@@ -0,0 +1,270 @@
+# bench_faucet.py — Offline benchmark main.py pakai faucet tiruan lokal
+# - Server HTTP lokal: halaman mirip faucet (input address + tombol claim)
+#   dan endpoint JSON /api/claim dengan latency & campuran hasil yang bisa diatur
+# - main.py dijalankan sebagai subprocess dengan FAUCET_URL diarahkan ke server lokal
+# - Laporan: address/menit, latency per stage (dari metrics_summary.json), peak RSS
+# Cara pakai ringkas:
+#   python bench_faucet.py --addresses 40 --concurrency 1,2,4
+#   python bench_faucet.py --serve-only --port 8765   (server saja, FAUCET_URL=http://127.0.0.1:8765)
+
+import argparse
+import json
+import os
+import random
+import secrets
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+try:
+    import psutil
+except Exception:
+    psutil = None
+
+MAIN_PY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+PAGE_HTML = """<!doctype html>
+<html>
+<head><meta charset="utf-8"><title>Mars Faucet (local bench)</title></head>
+<body>
+  <h1>Mars Testnet Faucet</h1>
+  <input type="text" placeholder="Enter your wallet address" id="addr">
+  <button id="claim">Claim</button>
+  <div class="toast" role="status" id="toast"></div>
+  <script>
+    document.getElementById("claim").addEventListener("click", async () => {
+      const address = document.getElementById("addr").value;
+      const toast = document.getElementById("toast");
+      try {
+        const r = await fetch("/api/claim", {
+          method: "POST",
+          headers: {"content-type": "application/json"},
+          body: JSON.stringify({address}),
+        });
+        const js = await r.json();
+        toast.textContent = js.message || js.error || "";
+      } catch (e) {
+        toast.textContent = String(e);
+      }
+    });
+  </script>
+</body>
+</html>
+"""
+
+# outcome → (HTTP status, body JSON)
+OUTCOMES = {
+    "success": (200, {"message": "Claim success, tokens sent"}),
+    "already": (400, {"message": "Address already claimed today"}),
+    "rate":    (429, {"message": "Too many requests, please wait"}),
+    "error":   (500, {"error": "internal server error"}),
+}
+
+class FaucetState:
+    def __init__(self, latency: Tuple[float, float], mix: Dict[str, float]):
+        self.latency = latency
+        self.outcomes = list(mix)
+        self.weights = [mix[k] for k in self.outcomes]
+        self.lock = threading.Lock()
+        self.served: Dict[str, int] = {k: 0 for k in OUTCOMES}
+
+    def pick(self) -> str:
+        out = random.choices(self.outcomes, weights=self.weights)[0]
+        with self.lock:
+            self.served[out] += 1
+        return out
+
+def make_handler(state: FaucetState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass  # jangan ramein output bench
+
+        def _send(self, code: int, body: bytes, ctype: str):
+            self.send_response(code)
+            self.send_header("content-type", ctype)
+            self.send_header("content-length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path in ("/", "/index.html"):
+                self._send(200, PAGE_HTML.encode(), "text/html; charset=utf-8")
+            else:
+                self._send(404, b"not found", "text/plain")
+
+        def do_POST(self):
+            if not self.path.startswith("/api/claim"):
+                self._send(404, b"not found", "text/plain")
+                return
+            self.rfile.read(int(self.headers.get("content-length") or 0))
+            time.sleep(random.uniform(*state.latency))
+            code, js = OUTCOMES[state.pick()]
+            self._send(code, json.dumps(js).encode(), "application/json")
+
+    return Handler
+
+def start_server(port: int, state: FaucetState) -> ThreadingHTTPServer:
+    srv = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+def tree_rss(pid: int) -> int:
+    """Total RSS (bytes) proses + semua turunannya (Chromium ikut terhitung)."""
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            procs = [root] + root.children(recursive=True)
+            total = 0
+            for p in procs:
+                try:
+                    total += p.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total
+        except psutil.Error:
+            return 0
+    # Fallback Linux: /proc
+    children: Dict[int, List[int]] = {}
+    rss: Dict[int, int] = {}
+    page = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+    try:
+        pids = [int(d) for d in os.listdir("/proc") if d.isdigit()]
+    except OSError:
+        return 0
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/stat", "r") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(p)
+            with open(f"/proc/{p}/statm", "r") as f:
+                rss[p] = int(f.read().split()[1]) * page
+        except (OSError, IndexError, ValueError):
+            continue
+    total, stack = 0, [pid]
+    while stack:
+        p = stack.pop()
+        total += rss.get(p, 0)
+        stack.extend(children.get(p, []))
+    return total
+
+def write_addresses(path: str, n: int):
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(n):
+            f.write("0x" + secrets.token_hex(20) + "\n")
+
+def run_once(url: str, concurrency: int, n_addr: int, action_delay: str, workdir: str) -> dict:
+    run_dir = os.path.join(workdir, f"c{concurrency}")
+    os.makedirs(run_dir, exist_ok=True)
+    addr_file = os.path.join(run_dir, "address.txt")
+    write_addresses(addr_file, n_addr)
+    env = dict(os.environ,
+               FAUCET_URL=url,
+               CONCURRENCY=str(concurrency),
+               CONCURRENCY_MIN=str(concurrency),
+               CONCURRENCY_MAX=str(concurrency),
+               ACTION_DELAY=action_delay,
+               USE_PROXY="0",
+               ADDRESS_FILE=addr_file,
+               OUT_DIR=os.path.join(run_dir, "out"))
+
+    peak = 0
+    t0 = time.time()
+    with open(os.path.join(run_dir, "main.log"), "w", encoding="utf-8") as log:
+        proc = subprocess.Popen([sys.executable, MAIN_PY], env=env, stdout=log, stderr=subprocess.STDOUT)
+        while proc.poll() is None:
+            peak = max(peak, tree_rss(proc.pid))
+            time.sleep(0.5)
+    elapsed = time.time() - t0
+
+    summary = {}
+    try:
+        with open(os.path.join(run_dir, "out", "metrics_summary.json"), "r", encoding="utf-8") as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        pass
+    return {
+        "concurrency": concurrency,
+        "addresses": n_addr,
+        "exit_code": proc.returncode,
+        "elapsed_s": round(elapsed, 2),
+        "addr_per_min": round(n_addr / elapsed * 60, 2) if elapsed else 0.0,
+        "peak_rss_mb": round(peak / 1024 / 1024, 1),
+        "statuses": summary.get("statuses", {}),
+        "stages": summary.get("stages", {}),
+        "log": os.path.join(run_dir, "main.log"),
+    }
+
+def print_report(results: List[dict]):
+    print()
+    print(f"{'conc':>4}  {'addr/min':>9}  {'elapsed':>8}  {'peak RSS':>9}  statuses")
+    for r in results:
+        print(f"{r['concurrency']:>4}  {r['addr_per_min']:>9.2f}  {r['elapsed_s']:>7.1f}s  "
+              f"{r['peak_rss_mb']:>7.1f}MB  {r['statuses']}  (exit {r['exit_code']})")
+    for r in results:
+        if not r["stages"]:
+            continue
+        print(f"\n-- concurrency {r['concurrency']} stage latency (s) --")
+        print(f"{'stage':<14}{'count':>6}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for name, st in r["stages"].items():
+            print(f"{name:<14}{st['count']:>6}{st['p50_s']:>9.3f}{st['p95_s']:>9.3f}{st['p99_s']:>9.3f}")
+
+def parse_mix(s: str) -> Dict[str, float]:
+    mix = {}
+    for part in s.split(","):
+        k, v = part.split("=")
+        if k not in OUTCOMES:
+            raise argparse.ArgumentTypeError(f"outcome tidak dikenal: {k} (pilih {', '.join(OUTCOMES)})")
+        mix[k] = float(v)
+    return mix
+
+def main():
+    ap = argparse.ArgumentParser(description="Offline benchmark main.py terhadap faucet tiruan lokal.")
+    ap.add_argument("--addresses", type=int, default=40, help="jumlah address per run")
+    ap.add_argument("--concurrency", default="1,2,4", help="daftar CONCURRENCY, pisah koma")
+    ap.add_argument("--latency", default="0.2,0.8", help="latency /api/claim min,max (detik)")
+    ap.add_argument("--mix", type=parse_mix, default=parse_mix("success=0.85,already=0.1,rate=0,error=0.05"),
+                    help="campuran hasil, mis. success=0.8,already=0.1,rate=0.05,error=0.05")
+    ap.add_argument("--action-delay", default="0,0", help="ACTION_DELAY untuk main.py (min,max)")
+    ap.add_argument("--port", type=int, default=0, help="port server lokal (0 = acak)")
+    ap.add_argument("--json", help="simpan hasil mentah ke file JSON ini")
+    ap.add_argument("--serve-only", action="store_true", help="jalankan server saja, tanpa benchmark")
+    args = ap.parse_args()
+
+    lat = tuple(float(x) for x in args.latency.split(","))
+    state = FaucetState(lat, args.mix)
+    srv = start_server(args.port, state)
+    url = f"http://127.0.0.1:{srv.server_address[1]}"
+    print(f"[i] Local faucet: {url}  latency={lat}  mix={args.mix}")
+
+    if args.serve_only:
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="faucet-bench-") as workdir:
+        for c in (int(x) for x in args.concurrency.split(",")):
+            print(f"[i] Run concurrency={c}, {args.addresses} address ...", flush=True)
+            r = run_once(url, c, args.addresses, args.action_delay, workdir)
+            if r["exit_code"] != 0:
+                with open(r["log"], "r", encoding="utf-8", errors="replace") as f:
+                    print(f.read()[-2000:])
+            r.pop("log")
+            results.append(r)
+    srv.shutdown()
+
+    print_report(results)
+    print(f"\nServed: {state.served}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
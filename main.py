@@ -6,17 +6,33 @@
 
 import asyncio
 import csv
+import hashlib
 import json
 import os
+import queue
 import random
 import re
+import signal
+import sqlite3
 import sys
+import threading
 import time
+import atexit
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, Tuple, List
+from typing import Dict, Iterator, Optional, Tuple, List
+from urllib.parse import urlsplit
 
-from playwright.async_api import async_playwright, BrowserContext, Page, Error as PWError
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Error as PWError
+
+# psutil opsional (cek CPU/RAM host), fallback ke loadavg + /proc/meminfo
+try:
+    import psutil
+except Exception:
+    psutil = None
 
 # ====== Branding / Colors ======
 # Pakai colorama kalau ada (Windows friendly), fallback ke ANSI
@@ -32,30 +48,100 @@ except Exception:
 
 def pad(n: int = 1):
     """Print n blank lines untuk jarak log."""
-    print("\n" * n, end="")
+    LOGGER.raw("\n" * n)
 
 def banner():
     print("=" * 50)
     print(f"   🚀 {GREEN}Follow https://x.com/BoldjaW1M{RESET} 🚀")
     print("=" * 50)
 
-FAUCET_URL = "https://faucet.mars.movachain.com"
+# Override lewat env (mis. FAUCET_URL=http://127.0.0.1:8765 untuk bench_faucet.py)
+FAUCET_URL = os.getenv("FAUCET_URL") or "https://faucet.mars.movachain.com"
 
 # ==== Konfigurasi umum ====
 HEADLESS = True
-CONCURRENCY = 2
-ACTION_DELAY = (2.0, 5.0)         # detik
+CONCURRENCY = int(os.getenv("CONCURRENCY") or 2)           # concurrency awal (adaptif, lihat AIMD_*)
+CONCURRENCY_MIN = int(os.getenv("CONCURRENCY_MIN") or 1)
+CONCURRENCY_MAX = int(os.getenv("CONCURRENCY_MAX") or 6)
+ACTION_DELAY = tuple(float(x) for x in (os.getenv("ACTION_DELAY") or "2.0,5.0").split(","))  # detik (min,max)
+USE_PROXY = os.getenv("USE_PROXY", "1") != "0"   # 0 = koneksi langsung, tanpa proxies.txt
 RETRIES = 2                        # retry ringan
-SAVE_CSV = True                    # set False jika tak perlu CSV
+SAVE_CSV = True                    # set False jika tak perlu file hasil
+RESULT_FORMAT = "csv"              # "csv" | "jsonl"
+
+# Logging
+LOG_LEVEL = (os.getenv("LOG_LEVEL") or "INFO").upper()   # DEBUG | INFO | WARN | ERROR
+DEBUG_FULL = os.getenv("DEBUG_FULL") == "1"   # semua level + page console tanpa sampling
+PAGE_CONSOLE_RATE = 2.0           # pesan page console/error per detik per page (sisanya di-drop)
+PAGE_CONSOLE_BURST = 10
 
 # Timeout (ms)
 TIMEOUT_GOTO_MS = 30000           # page.goto
-TIMEOUT_WAIT_SEL_MS = 8000        # tunggu selector
+TIMEOUT_WAIT_SEL_MS = 8000        # tunggu selector (semua kandidat di-race bareng)
+TIMEOUT_CACHED_SEL_MS = 3000      # selector hasil belajar dicoba dulu sebentar
 TASK_WATCHDOG_S = 120             # timeout per-address task (hard cap)
+CLEANUP_TIMEOUT_S = 10            # batas waktu close page/context/browser; lewat → kill
+API_CAPTURE_TIMEOUT_S = 5.0       # batas atas nunggu response claim (detik)
+RETRY_REUSE_PAGE = True           # retry pakai page yang sama; goto ulang cuma kalau DOM rusak
+
+# AIMD: naik +1 kalau sehat, potong kalau ada rate_limited
+AIMD_TARGET_LATENCY_S = 30.0      # claim (per attempt) di bawah ini dianggap sehat
+AIMD_INCREASE_EVERY = 3           # naik +1 tiap N hasil sehat berturut-turut
+AIMD_DECREASE_FACTOR = 0.5        # limit *= factor saat rate_limited
+RATE_LIMIT_COOLDOWN_S = 20.0      # semua worker jeda setelah rate_limited
+HOST_CPU_MAX = 85.0               # % CPU host; di atas ini gak naik
+HOST_MEM_MAX = 85.0               # % RAM host; di atas ini gak naik
+
+# Browser pool: browser long-lived, tiap address cukup dapat context baru
+BROWSER_POOL_SIZE = CONCURRENCY_MAX  # jumlah browser maksimum yang hidup bareng
+BROWSER_RECYCLE_CONTEXTS = 50     # relaunch browser setelah N context
+BROWSER_RECYCLE_S = 1800          # ... atau setelah umur N detik
+
+# Resource policy: request yang gak dibutuhin flow claim di-abort per context
+BLOCK_RESOURCES = True
+BLOCK_RESOURCE_TYPES = {"image", "media", "font"}
+BLOCK_THIRD_PARTY = True          # domain di luar situs faucet di-abort, kecuali allowlist
+RESOURCE_ALLOWLIST = [            # suffix domain pihak ketiga yang tetap boleh
+    "hcaptcha.com",
+    "recaptcha.net",
+    "google.com",
+    "gstatic.com",
+]
+
+# Asset cache: GET statis (JS/CSS/...) di-share antar context & antar run
+CACHE_ASSETS = True
+ASSET_CACHE_TYPES = {"script", "stylesheet", "font", "image"}
+ASSET_CACHE_MAX_BYTES = 200 * 1024 * 1024   # LRU evict di atas ini
+
+# Input
+ADDRESS_FILE = os.getenv("ADDRESS_FILE") or "address.txt"
+PROXIES_FILE = os.getenv("PROXIES_FILE") or "proxies.txt"
+QUEUE_SIZE = CONCURRENCY_MAX * 2  # antrean address (bounded) di depan worker
 
 # Output
-OUT_DIR = "out"
+OUT_DIR = os.getenv("OUT_DIR") or "out"
 RESULT_CSV = os.path.join(OUT_DIR, "results.csv")
+RESULT_JSONL = os.path.join(OUT_DIR, "results.jsonl")
+RESULT_FIELDS = ["timestamp", "address", "status", "message", "proxy", "ip"]
+RESULT_BATCH_SIZE = 50            # max row per tulis
+RESULT_FLUSH_S = 1.0              # jeda ngumpulin row sebelum tulis
+RESULT_FSYNC_S = 10.0             # fsync paling sering tiap N detik
+
+ASSET_CACHE_DIR = os.path.join(OUT_DIR, "asset_cache")
+
+# Metrics per stage (histogram p50/p95/p99)
+METRICS_PROM_FILE = os.path.join(OUT_DIR, "metrics.prom")             # Prometheus textfile, update berkala
+METRICS_SUMMARY_FILE = os.path.join(OUT_DIR, "metrics_summary.json")  # ringkasan akhir run
+METRICS_EXPORT_S = 15.0           # interval tulis metrics.prom
+METRICS_BUCKETS_S = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+METRICS_RESERVOIR = 2048          # sampel per stage untuk persentil
+
+# State per address (resume setelah crash / Ctrl-C)
+STATE_DB = os.path.join(OUT_DIR, "state.sqlite")
+RESUME = True                     # skip address yang sudah selesai di run sebelumnya
+TERMINAL_STATUSES = ("success", "already")
+RESUME_LOOKUP_BATCH = 500         # address per query cek state
+SELECTOR_CACHE_FILE = os.path.join(OUT_DIR, "selector_cache.json")
 
 # ====== Selector heuristik (ubah jika UI berubah) ======
 SELECTORS = {
@@ -79,19 +165,122 @@ SELECTORS = {
         'div[role="status"]',
     ],
 }
+# Kandidat terakhir yang match elemen apa saja: boleh dipakai sebagai fallback,
+# tapi jangan pernah diingat (gak akan pernah "stale", selector spesifik gak dicoba lagi)
+CATCHALL_SELECTORS = {'input', 'button', '[role="button"]'}
 
 # Heuristik klasifikasi pesan
 SUCCESS_HINTS = ["success", "claimed", "ok", "done"]
 ALREADY_HINTS = ["already", "once", "claimed", "limit", "duplicate"]
 RATE_HINTS    = ["rate", "too many", "wait", "cooldown", "busy"]
 CAPTCHA_HINTS = ["captcha", "hcaptcha", "recaptcha", "human"]
+API_URL_HINTS = ["claim", "faucet", "drip", "/api/"]
+CAPTCHA_PAGE_KEYS = ["hcaptcha", "recaptcha"]
 
 ADDRESS_RE = re.compile(r"^0x[a-fA-F0-9]{40}$")
 
 # ===== Utilities =====
-def dlog(s: str):
-    now = datetime.now().strftime("%H:%M:%S")
-    print(f"[{now}] {s}", flush=True)
+DEBUG, INFO, WARN, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {"DEBUG": DEBUG, "INFO": INFO, "WARN": WARN, "WARNING": WARN, "ERROR": ERROR}
+
+# Address yang sedang diproses task ini (prefix otomatis di log)
+LOG_ADDRESS: ContextVar[str] = ContextVar("log_address", default="")
+
+class AsyncLogger:
+    """Logger non-blocking: emit() cuma masuk antrean, thread writer yang format
+    timestamp & nulis ke stdout per batch (satu flush per batch)."""
+
+    _STOP = object()
+
+    def __init__(self, level: int, stream=None):
+        self.level = level
+        self.stream = stream or sys.stdout
+        self._q: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    def emit(self, level: int, msg: str, address: Optional[str] = None):
+        if level < self.level:
+            return
+        self._ensure_started()
+        self._q.put((time.time(), level, LOG_ADDRESS.get() if address is None else address, msg))
+
+    def raw(self, text: str):
+        self._ensure_started()
+        self._q.put((None, 0, "", text))
+
+    def _format(self, item, stamps: dict) -> str:
+        ts, level, addr, msg = item
+        if ts is None:
+            return msg
+        sec = int(ts)
+        now = stamps.get(sec)
+        if now is None:
+            now = stamps[sec] = time.strftime("%H:%M:%S", time.localtime(sec))
+        tag = "" if level == INFO else ("DEBUG " if level == DEBUG else ("WARN " if level == WARN else "ERROR "))
+        where = f"[{addr}] " if addr else ""
+        return f"[{now}] {tag}{where}{msg}\n"
+
+    def _run(self):
+        stamps: dict = {}
+        while True:
+            batch = [self._q.get()]
+            while len(batch) < 512:
+                try:
+                    batch.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(it is self._STOP for it in batch)
+            if len(stamps) > 64:
+                stamps.clear()
+            try:
+                self.stream.write("".join(self._format(it, stamps) for it in batch if it is not self._STOP))
+                self.stream.flush()
+            except Exception:
+                pass
+            if stop:
+                return
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._q.put(self._STOP)
+            self._thread.join(timeout=5)
+
+LOGGER = AsyncLogger(DEBUG if DEBUG_FULL else LEVEL_NAMES.get(LOG_LEVEL, INFO))
+
+def dlog(s: str, level: int = INFO, address: Optional[str] = None):
+    LOGGER.emit(level, s, address)
+
+class TokenBucket:
+    """Rate limiter sederhana untuk forward page console (per page)."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+        self.dropped = 0
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.dropped += 1
+        return False
 
 @dataclass
 class ProxyConf:
@@ -106,6 +295,16 @@ def parse_proxy_url(url: str) -> ProxyConf:
     server = f"{m.group(1)}://{m.group('hostport')}"
     return ProxyConf(server=server, username=m.group("user"), password=m.group("pw"))
 
+def iter_lines(path: str) -> Iterator[str]:
+    """Baca file baris per baris (lazy), skip baris kosong."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for ln in f:
+            ln = ln.strip()
+            if ln:
+                yield ln
+
 def load_lines(path: str) -> List[str]:
     if not os.path.exists(path):
         return []
@@ -120,9 +319,6 @@ def rand_delay() -> float:
 
 def ensure_outdir():
     os.makedirs(OUT_DIR, exist_ok=True)
-    if SAVE_CSV and not os.path.exists(RESULT_CSV):
-        with open(RESULT_CSV, "w", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow(["timestamp", "address", "status", "message", "proxy", "ip"])
 
 def classify_message(msg: str) -> Tuple[str, str]:
     mlow = (msg or "").lower()
@@ -136,27 +332,240 @@ def classify_message(msg: str) -> Tuple[str, str]:
         return ("success", msg)
     return ("unknown", msg)
 
+# ===== Metrics =====
+class StageHistogram:
+    """Bucket kumulatif ala Prometheus + reservoir sample (memory tetap) untuk persentil."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(METRICS_BUCKETS_S)
+        self.samples: List[float] = []
+
+    def observe(self, v: float):
+        self.count += 1
+        self.total += v
+        self.max = max(self.max, v)
+        for i, le in enumerate(METRICS_BUCKETS_S):
+            if v <= le:
+                self.buckets[i] += 1
+        if len(self.samples) < METRICS_RESERVOIR:
+            self.samples.append(v)
+        else:
+            j = random.randrange(self.count)
+            if j < METRICS_RESERVOIR:
+                self.samples[j] = v
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        xs = sorted(self.samples)
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+class Metrics:
+    """Span per stage pipeline claim → histogram, counter (status & lainnya), dan gauge."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages: Dict[str, StageHistogram] = {}
+        self.statuses: Counter = Counter()
+        self.counters: Counter = Counter()
+        self.gauges: Dict[str, float] = {}
+
+    def observe(self, stage: str, seconds: float):
+        h = self.stages.get(stage)
+        if h is None:
+            h = self.stages[stage] = StageHistogram()
+        h.observe(seconds)
+
+    @contextmanager
+    def span(self, stage: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0)
+
+    def count_status(self, status: str):
+        self.statuses[status] += 1
+
+    def inc(self, name: str, n: int = 1):
+        self.counters[name] += n
+
+    def set_gauge(self, name: str, value: float):
+        self.gauges[name] = value
+
+    def summary(self) -> dict:
+        return {
+            "started": datetime.utcfromtimestamp(self.started).isoformat(),
+            "elapsed_s": round(time.time() - self.started, 3),
+            "statuses": dict(self.statuses),
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+            "stages": {
+                name: {
+                    "count": h.count,
+                    "mean_s": round(h.total / h.count, 4) if h.count else 0.0,
+                    "p50_s": round(h.percentile(0.50), 4),
+                    "p95_s": round(h.percentile(0.95), 4),
+                    "p99_s": round(h.percentile(0.99), 4),
+                    "max_s": round(h.max, 4),
+                }
+                for name, h in sorted(self.stages.items())
+            },
+        }
+
+    def prometheus_text(self) -> str:
+        out = [
+            "# HELP faucet_stage_duration_seconds Durasi per stage pipeline claim.",
+            "# TYPE faucet_stage_duration_seconds histogram",
+        ]
+        for name, h in sorted(self.stages.items()):
+            for le, n in zip(METRICS_BUCKETS_S, h.buckets):
+                out.append(f'faucet_stage_duration_seconds_bucket{{stage="{name}",le="{le}"}} {n}')
+            out.append(f'faucet_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {h.count}')
+            out.append(f'faucet_stage_duration_seconds_sum{{stage="{name}"}} {h.total:.6f}')
+            out.append(f'faucet_stage_duration_seconds_count{{stage="{name}"}} {h.count}')
+        out.append("# HELP faucet_results_total Jumlah hasil per status.")
+        out.append("# TYPE faucet_results_total counter")
+        for st, n in sorted(self.statuses.items()):
+            out.append(f'faucet_results_total{{status="{st}"}} {n}')
+        for name, n in sorted(self.counters.items()):
+            out.append(f"# TYPE faucet_{name}_total counter")
+            out.append(f"faucet_{name}_total {n}")
+        for name, v in sorted(self.gauges.items()):
+            out.append(f"# TYPE faucet_{name} gauge")
+            out.append(f"faucet_{name} {v}")
+        return "\n".join(out) + "\n"
+
+    def _write_atomic(self, path: str, text: str):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def write_prometheus(self, path: str = METRICS_PROM_FILE):
+        self._write_atomic(path, self.prometheus_text())
+
+    def write_summary(self, path: str = METRICS_SUMMARY_FILE):
+        self._write_atomic(path, json.dumps(self.summary(), indent=2))
+
+METRICS = Metrics()
+
+async def metrics_exporter():
+    """Tulis metrics.prom tiap METRICS_EXPORT_S selama run."""
+    while True:
+        await asyncio.sleep(METRICS_EXPORT_S)
+        try:
+            # render di loop thread (dict metrics cuma diubah di sini), thread cuma nulis file
+            text = METRICS.prometheus_text()
+            await asyncio.to_thread(METRICS._write_atomic, METRICS_PROM_FILE, text)
+        except Exception as e:
+            dlog(f"Metrics export failed: {e}", WARN)
+
 # ===== Playwright helpers =====
-async def wait_and_type(page: Page, selector_candidates: List[str], text: str) -> bool:
-    for sel in selector_candidates:
+class SelectorResolver:
+    """Race semua kandidat selector sekaligus, ambil yang pertama match.
+
+    Pemenang per role diingat dan disimpan ke SELECTOR_CACHE_FILE, jadi address
+    berikutnya (dan run berikutnya) langsung coba selector yang sudah terbukti.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.learned: dict = {}
+        self._loaded = False
+
+    def _load(self):
+        self._loaded = True
         try:
-            await page.wait_for_selector(sel, timeout=TIMEOUT_WAIT_SEL_MS)
-            dlog(f"  - Typing address into selector: {sel}")
-            await page.fill(sel, text)
-            return True
-        except Exception:
-            continue
-    return False
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self.learned = {k: v for k, v in data.items()
+                                if isinstance(v, str) and v not in CATCHALL_SELECTORS}
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.learned, f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            dlog(f"  - Selector cache not saved: {e}")
+
+    async def resolve(self, page: Page, role: str) -> Optional[str]:
+        if not self._loaded:
+            self._load()
+        known = self.learned.get(role)
+        if known:
+            try:
+                await page.wait_for_selector(known, timeout=TIMEOUT_CACHED_SEL_MS)
+                return known
+            except Exception:
+                dlog(f"  - Learned selector for {role} stale: {known}", DEBUG)
+        winner = await self._race(page, SELECTORS[role])
+        if winner in CATCHALL_SELECTORS:
+            dlog(f"  - {role} resolved via catch-all {winner} (not cached)", DEBUG)
+        elif winner and winner != known:
+            self.learned[role] = winner
+            self._save()
+        return winner
 
-async def wait_and_click(page: Page, selector_candidates: List[str]) -> bool:
-    for sel in selector_candidates:
+    async def _race(self, page: Page, candidates: List[str]) -> Optional[str]:
+        tasks = {
+            asyncio.ensure_future(page.wait_for_selector(sel, timeout=TIMEOUT_WAIT_SEL_MS)): i
+            for i, sel in enumerate(candidates)
+        }
+        winner = None
         try:
-            await page.wait_for_selector(sel, timeout=TIMEOUT_WAIT_SEL_MS)
-            dlog(f"  - Clicking button: {sel}")
+            pending = set(tasks)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                ok = [tasks[t] for t in done if not t.cancelled() and t.exception() is None]
+                if ok:
+                    winner = min(ok)
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if winner is None:
+            return None
+        # Kandidat yang lebih spesifik (urutan lebih awal) tetap menang kalau sudah visible juga
+        for sel in candidates[:winner]:
+            try:
+                el = await page.query_selector(sel)
+                if el and await el.is_visible():
+                    return sel
+            except Exception:
+                continue
+        return candidates[winner]
+
+RESOLVER = SelectorResolver(SELECTOR_CACHE_FILE)
+
+async def wait_and_type(page: Page, role: str, text: str) -> bool:
+    sel = await RESOLVER.resolve(page, role)
+    if not sel:
+        return False
+    try:
+        dlog(f"  - Typing address into selector: {sel}", DEBUG)
+        await page.fill(sel, text)
+        return True
+    except Exception:
+        return False
+
+async def wait_and_click(page: Page, role: str) -> bool:
+    sel = await RESOLVER.resolve(page, role)
+    if sel:
+        try:
+            dlog(f"  - Clicking button: {sel}", DEBUG)
             await page.click(sel)
             return True
         except Exception:
-            continue
+            pass
     try:
         dlog("  - Fallback: clicking first role=button")
         await page.get_by_role("button").first.click(timeout=2000)
@@ -164,68 +573,80 @@ async def wait_and_click(page: Page, selector_candidates: List[str]) -> bool:
     except Exception:
         return False
 
-async def sniff_api_message(page: Page) -> Optional[str]:
-    """Ambil pesan dari XHR/fetch yang mengandung kata kunci endpoint."""
-    dlog("  - Sniffing API responses...")
-    found_msg = None
-
-    def pick_message_from_json(js: dict) -> Optional[str]:
+def pick_message_from_json(js) -> Optional[str]:
+    if isinstance(js, dict):
         for k in ("message", "msg", "detail", "error", "status"):
             if k in js and isinstance(js[k], (str, int, float)):
                 return str(js[k])
-        try:
-            return json.dumps(js)[:300]
-        except Exception:
-            return None
+    try:
+        return json.dumps(js)[:300]
+    except Exception:
+        return None
+
+async def read_response_message(resp) -> Optional[str]:
+    try:
+        ctype = resp.headers.get("content-type", "").lower()
+        if "application/json" in ctype:
+            return pick_message_from_json(await resp.json())
+        txt = (await resp.text())[:500]
+        return txt or None
+    except Exception:
+        return None
 
-    t_end = time.time() + 5.0
-    responses = []
+class ResponseCapture:
+    """Tangkap pesan dari XHR/fetch yang mengandung kata kunci endpoint.
 
-    def _resp_handler(resp):
+    Di-arm SEBELUM klik supaya response yang cepat gak kelewat; wait() selesai
+    begitu response pertama yang cocok berhasil di-parse (maks API_CAPTURE_TIMEOUT_S).
+    """
+
+    def __init__(self, page: Page):
+        self.page = page
+        self._done: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._parsing: set = set()
+        self._armed = False
+
+    def arm(self) -> "ResponseCapture":
+        self.page.on("response", self._on_response)
+        self._armed = True
+        return self
+
+    def disarm(self):
+        if self._armed:
+            try:
+                self.page.remove_listener("response", self._on_response)
+            except Exception:
+                pass
+            self._armed = False
+        for t in list(self._parsing):
+            t.cancel()
+
+    def _on_response(self, resp):
+        if self._done.done():
+            return
         try:
             url = resp.url.lower()
-            if any(s in url for s in ["claim", "faucet", "drip", "/api/"]):
-                responses.append(resp)
         except Exception:
-            pass
+            return
+        if any(s in url for s in API_URL_HINTS):
+            t = asyncio.ensure_future(self._parse(resp))
+            self._parsing.add(t)
+            t.add_done_callback(self._parsing.discard)
 
-    page.on("response", _resp_handler)
-    while time.time() < t_end:
-        await asyncio.sleep(0.2)
+    async def _parse(self, resp):
+        msg = await read_response_message(resp)
+        if msg and not self._done.done():
+            self._done.set_result(msg)
 
-    for resp in responses:
+    async def wait(self, timeout: Optional[float] = None) -> Optional[str]:
+        dlog("  - Waiting for API response...", DEBUG)
         try:
-            ctype = resp.headers.get("content-type", "").lower()
-            if "application/json" in ctype:
-                js = await resp.json()
-                msg = pick_message_from_json(js)
-                if msg:
-                    found_msg = msg
-                    break
-            else:
-                txt = (await resp.text())[:500]
-                if txt:
-                    found_msg = txt
-                    break
-        except Exception:
-            continue
-    dlog(f"  - API message: {found_msg!r}")
-    return found_msg
-
-async def check_captcha_presence(page: Page) -> bool:
-    """Deteksi kasar keberadaan hCaptcha/reCAPTCHA (iframe/src/teks)."""
-    try:
-        els = await page.query_selector_all("iframe")
-        for el in els:
-            src = (await el.get_attribute("src") or "").lower()
-            if any(k in src for k in ["hcaptcha", "recaptcha"]):
-                return True
-        body = (await page.content()).lower()
-        if any(k in body for k in ["hcaptcha", "recaptcha"]):
-            return True
-    except Exception:
-        pass
-    return False
+            msg = await asyncio.wait_for(asyncio.shield(self._done),
+                                         timeout=API_CAPTURE_TIMEOUT_S if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            msg = None
+        dlog(f"  - API message: {msg!r}")
+        return msg
 
 async def get_public_ip_via_context(context: BrowserContext) -> str:
     try:
@@ -237,171 +658,992 @@ async def get_public_ip_via_context(context: BrowserContext) -> str:
         pass
     return ""
 
-async def claim_once(context: BrowserContext, address: str) -> Tuple[str, str]:
-    """Return (status, message). status: success|already|captcha|rate_limited|unknown|error"""
+# Satu kali page.evaluate: captcha, teks banner, dan state form sekaligus
+PROBE_JS = """
+([inputSels, buttonSels, bannerSels, keys]) => {
+  const first = (sels) => {
+    for (const s of sels) {
+      try { if (document.querySelector(s)) return s; } catch (e) { /* selector non-CSS */ }
+    }
+    return null;
+  };
+  let captcha = false;
+  for (const f of document.querySelectorAll("iframe")) {
+    const src = (f.getAttribute("src") || "").toLowerCase();
+    if (keys.some((k) => src.includes(k))) { captcha = true; break; }
+  }
+  if (!captcha && document.documentElement) {
+    const html = document.documentElement.outerHTML.toLowerCase();
+    captcha = keys.some((k) => html.includes(k));
+  }
+  let banner = null;
+  for (const s of bannerSels) {
+    try {
+      const el = document.querySelector(s);
+      const t = el && (el.textContent || "").trim();
+      if (t) { banner = t.slice(0, 500); break; }
+    } catch (e) { /* selector non-CSS */ }
+  }
+  return {captcha, banner, input: first(inputSels), button: first(buttonSels)};
+}
+"""
+
+@dataclass
+class PageProbe:
+    captcha: bool = False
+    banner: Optional[str] = None
+    input_sel: Optional[str] = None
+    button_sel: Optional[str] = None
+
+    @property
+    def form_ok(self) -> bool:
+        return bool(self.input_sel and self.button_sel)
+
+async def probe_page(page: Page) -> PageProbe:
+    """Deteksi captcha (iframe/src/teks), banner status, dan form dalam satu round-trip."""
+    if page.is_closed():
+        return PageProbe()
+
+    def cands(role: str) -> List[str]:
+        learned = RESOLVER.learned.get(role)
+        return ([learned] if learned else []) + SELECTORS[role]
+
+    try:
+        with METRICS.span("probe"):
+            r = await page.evaluate(PROBE_JS, [cands("address_input"), cands("claim_button"),
+                                               SELECTORS["status_banner"], CAPTCHA_PAGE_KEYS])
+        return PageProbe(bool(r.get("captcha")), r.get("banner"), r.get("input"), r.get("button"))
+    except Exception:
+        return PageProbe()
+
+def forward_page_logs(page: Page, address: str):
+    """Forward console & page error ke log. Console cuma di-subscribe kalau level
+    DEBUG aktif; di luar DEBUG_FULL keduanya di-sampling per page."""
+    bucket = None if DEBUG_FULL else TokenBucket(PAGE_CONSOLE_RATE, PAGE_CONSOLE_BURST)
+
+    def forward(level: int, text: str):
+        if bucket is not None and not bucket.allow():
+            return
+        if bucket is not None and bucket.dropped:
+            text = f"{text} (+{bucket.dropped} dropped)"
+            bucket.dropped = 0
+        dlog(text, level, address)
+
+    if LOGGER.enabled(DEBUG):
+        page.on("console", lambda msg: forward(DEBUG, f"  [page.console] {msg.type.upper()}: {msg.text}"))
+    page.on("pageerror", lambda exc: forward(WARN, f"  [page.error] {exc}"))
+
+async def open_claim_page(context: BrowserContext, address: str) -> Page:
     page = await context.new_page()
 
-    # Forward console logs & page errors agar kelihatan di terminal
-    page.on("console", lambda msg: dlog(f"  [page.console] {msg.type().upper()}: {msg.text()}"))
-    page.on("pageerror", lambda exc: dlog(f"  [page.error] {exc}"))
+    forward_page_logs(page, address)
+    return page
+
+async def claim_once(page: Page, address: str, fresh: bool = True) -> Tuple[str, str]:
+    """Return (status, message). status: success|already|captcha|rate_limited|unknown|error
 
+    fresh=False: page sisa attempt sebelumnya dipakai ulang; form di-reset di
+    tempat dan baru goto ulang kalau DOM-nya rusak.
+    """
+    capture = None
     try:
-        dlog(f"[{address}] Navigating to {FAUCET_URL} ...")
-        await page.goto(FAUCET_URL, timeout=TIMEOUT_GOTO_MS, wait_until="domcontentloaded")
-        dlog(f"[{address}] Page loaded (domcontentloaded)")
-        await asyncio.sleep(rand_delay())
+        probe = await probe_page(page) if not fresh else None
+        reuse = bool(probe and probe.form_ok)
+        if reuse:
+            dlog("Reusing loaded page (form reset in place)")
+            METRICS.inc("page_reuse")
+        else:
+            dlog(f"Navigating to {FAUCET_URL} ...")
+            with METRICS.span("goto"):
+                await page.goto(FAUCET_URL, timeout=TIMEOUT_GOTO_MS, wait_until="domcontentloaded")
+            dlog("Page loaded (domcontentloaded)", DEBUG)
+            await asyncio.sleep(rand_delay())
+            probe = await probe_page(page)
 
         # Captcha on landing?
-        if await check_captcha_presence(page):
-            dlog(f"[{address}] Captcha detected on landing → skip")
+        if probe.captcha:
+            dlog("Captcha detected on landing → skip")
             return ("captcha", "Captcha detected on page load")
 
+        # Banner sisa attempt sebelumnya jangan kebaca sebagai hasil baru
+        stale_banner = probe.banner if reuse else None
+
         # Isi address
-        ok = await wait_and_type(page, SELECTORS["address_input"], address)
+        with METRICS.span("type"):
+            ok = await wait_and_type(page, "address_input", address)
         if not ok:
             inputs = await page.query_selector_all("input")
             if inputs:
-                dlog(f"[{address}] Fallback: typing into first <input>")
+                dlog("Fallback: typing into first <input>")
                 await inputs[0].fill(address)
             else:
                 return ("error", "Address input not found")
 
         await asyncio.sleep(rand_delay())
 
-        # Klik claim
-        ok = await wait_and_click(page, SELECTORS["claim_button"])
+        # Arm capture dulu, baru klik claim
+        capture = ResponseCapture(page).arm()
+        with METRICS.span("click"):
+            ok = await wait_and_click(page, "claim_button")
         if not ok:
             return ("error", "Claim button not found")
 
-        await asyncio.sleep(rand_delay())
-
-        # Captcha after click?
-        if await check_captcha_presence(page):
-            dlog(f"[{address}] Captcha required after clicking → skip")
-            return ("captcha", "Captcha required after clicking claim")
+        # Ambil pesan dari API (selesai begitu response masuk)
+        with METRICS.span("response"):
+            msg = await capture.wait()
 
-        # Ambil pesan dari API/banner
-        msg = await sniff_api_message(page)
+        # Gak ada response → cek captcha after click, lalu fallback banner
         if not msg:
-            for sel in SELECTORS["status_banner"]:
-                try:
-                    el = await page.query_selector(sel)
-                    if el:
-                        text = (await el.text_content() or "").strip()
-                        if text:
-                            msg = text
-                            break
-                except Exception:
-                    continue
+            probe = await probe_page(page)
+            if probe.captcha:
+                dlog("Captcha required after clicking → skip")
+                return ("captcha", "Captcha required after clicking claim")
+            if probe.banner and probe.banner != stale_banner:
+                msg = probe.banner
 
         if not msg:
             msg = "No explicit message; UI/response not captured."
 
         status, message = classify_message(msg)
-        dlog(f"[{address}] Classified: {status} — {message}")
+        dlog(f"Classified: {status} — {message}")
         return (status, msg or message)
 
     except PWError as e:
-        dlog(f"[{address}] Playwright error: {e}")
+        dlog(f"Playwright error: {e}", ERROR)
         return ("error", f"PlaywrightError: {e}")
     except Exception as e:
-        dlog(f"[{address}] Exception: {type(e).__name__}: {e}")
+        dlog(f"Exception: {type(e).__name__}: {e}", ERROR)
         return ("error", f"{type(e).__name__}: {e}")
     finally:
+        if capture:
+            capture.disarm()
+
+# ===== Adaptive concurrency =====
+def host_load() -> Tuple[float, float]:
+    """(cpu %, mem %) host. Tanpa psutil: loadavg/cpu_count dan /proc/meminfo."""
+    if psutil is not None:
         try:
-            await page.close()
+            return psutil.cpu_percent(interval=None), psutil.virtual_memory().percent
         except Exception:
             pass
+    cpu = mem = 0.0
+    try:
+        cpu = os.getloadavg()[0] / (os.cpu_count() or 1) * 100
+    except (OSError, AttributeError):
+        pass
+    try:
+        info = {}
+        with open("/proc/meminfo", "r", encoding="utf-8") as f:
+            for ln in f:
+                k, v = ln.split(":", 1)
+                info[k] = int(v.split()[0])
+        mem = 100.0 * (1 - info["MemAvailable"] / info["MemTotal"])
+    except (OSError, KeyError, ValueError):
+        pass
+    return cpu, mem
+
+class ConcurrencyController:
+    """AIMD limiter: worker wajib acquire() slot sebelum proses address.
+
+    Limit naik +1 tiap AIMD_INCREASE_EVERY hasil sehat (latency di bawah target
+    dan host gak penuh), dan dipotong global begitu ada worker kena rate_limited
+    (plus cooldown bareng supaya faucet gak dihajar).
+    """
+
+    def __init__(self, start: int = CONCURRENCY, lo: int = CONCURRENCY_MIN, hi: int = CONCURRENCY_MAX):
+        self.lo, self.hi = max(1, lo), max(1, hi)
+        self.limit = min(max(start, self.lo), self.hi)
+        self.active = 0
+        self._cond = asyncio.Condition()
+        self._streak = 0
+        self._cooldown_until = 0.0
+        self._last_decrease = 0.0
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+        await self.wait_cooldown()
+
+    async def release(self):
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    async def wait_cooldown(self):
+        while True:
+            left = self._cooldown_until - time.monotonic()
+            if left <= 0:
+                return
+            await asyncio.sleep(left)
+
+    def on_rate_limited(self):
+        now = time.monotonic()
+        self._streak = 0
+        # satu burst rate_limited cukup motong sekali
+        if now - self._last_decrease >= RATE_LIMIT_COOLDOWN_S:
+            self._last_decrease = now
+            old = self.limit
+            self.limit = max(self.lo, int(self.limit * AIMD_DECREASE_FACTOR))
+            dlog(f"[aimd] rate_limited → concurrency {old} → {self.limit}, cooldown {RATE_LIMIT_COOLDOWN_S:.0f}s")
+        self._cooldown_until = max(self._cooldown_until, now + RATE_LIMIT_COOLDOWN_S)
+
+    async def on_result(self, status: str, latency_s: float):
+        if status == "rate_limited":
+            self.on_rate_limited()
+            return
+        if status not in ("success", "already"):
+            return
+        cpu, mem = host_load()
+        if latency_s > AIMD_TARGET_LATENCY_S or cpu > HOST_CPU_MAX or mem > HOST_MEM_MAX:
+            self._streak = 0
+            return
+        self._streak += 1
+        if self._streak >= AIMD_INCREASE_EVERY and self.limit < self.hi:
+            self._streak = 0
+            async with self._cond:
+                self.limit += 1
+                self._cond.notify_all()
+            dlog(f"[aimd] healthy (lat {latency_s:.1f}s, cpu {cpu:.0f}%, mem {mem:.0f}%) → concurrency {self.limit}")
+
+# ===== State store =====
+class StateStore:
+    """State per address di SQLite: status terakhir, jumlah attempt, timestamp.
+
+    Koneksi dipakai dari thread sink & producer (via to_thread), jadi semua akses
+    lewat lock.
+    """
+
+    def __init__(self, path: str = STATE_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS addresses ("
+                " address TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " message TEXT,"
+                " first_seen TEXT NOT NULL,"
+                " updated_at TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_addresses_status ON addresses(status)")
+
+    def done_among(self, addresses: List[str]) -> set:
+        """Subset address (lowercase) yang statusnya sudah terminal."""
+        keys = [a.lower() for a in addresses]
+        if not keys:
+            return set()
+        marks = ",".join("?" * len(keys))
+        terms = ",".join("?" * len(TERMINAL_STATUSES))
+        with self._lock:
+            cur = self._db.execute(
+                f"SELECT address FROM addresses WHERE address IN ({marks}) AND status IN ({terms})",
+                (*keys, *TERMINAL_STATUSES),
+            )
+            return {r[0] for r in cur}
+
+    def record_many(self, rows: List[Tuple[str, str, int, str, str]]):
+        """rows: (address, status, attempts, message, timestamp)."""
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO addresses (address, status, attempts, message, first_seen, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(address) DO UPDATE SET"
+                "  status = excluded.status,"
+                "  attempts = addresses.attempts + excluded.attempts,"
+                "  message = excluded.message,"
+                "  updated_at = excluded.updated_at",
+                [(a.lower(), st, n, msg, ts, ts) for a, st, n, msg, ts in rows],
+            )
+
+    def counts(self) -> List[Tuple[str, int]]:
+        with self._lock:
+            return list(self._db.execute(
+                "SELECT status, COUNT(*) FROM addresses GROUP BY status ORDER BY COUNT(*) DESC"))
+
+    def addresses_with(self, status: str) -> Iterator[Tuple[str, int, str, str]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT address, attempts, updated_at, message FROM addresses"
+                " WHERE status = ? ORDER BY updated_at", (status,)).fetchall()
+        yield from rows
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def state_cli(argv: List[str]) -> int:
+    """python main.py stats | python main.py list <status>"""
+    if not os.path.exists(STATE_DB):
+        print(f"{STATE_DB} belum ada (belum pernah run).")
+        return 1
+    store = StateStore(STATE_DB)
+    try:
+        if argv[0] == "stats":
+            rows = store.counts()
+            for st, n in rows:
+                print(f"{st:<14}{n}")
+            print(f"{'total':<14}{sum(n for _, n in rows)}")
+        elif argv[0] == "list" and len(argv) > 1:
+            for addr, attempts, updated_at, msg in store.addresses_with(argv[1]):
+                print(f"{addr}  attempts={attempts}  {updated_at}  {msg or ''}")
+        else:
+            print("Usage: python main.py stats | python main.py list <status>")
+            return 2
+    finally:
+        store.close()
+    return 0
+
+# ===== Result sink =====
+class ResultSink:
+    """Satu-satunya penulis file hasil (CSV atau JSONL).
+
+    Worker cukup put() row (non-blocking); coroutine sink ngumpulin row jadi
+    batch, nulis di thread terpisah, dan fsync berkala. Kalau ada StateStore,
+    batch yang sama sekalian di-upsert ke state.
+    """
+
+    def __init__(self, fmt: str = RESULT_FORMAT, state: Optional[StateStore] = None):
+        self.fmt = fmt
+        self.state = state
+        self.path = RESULT_JSONL if fmt == "jsonl" else RESULT_CSV
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._f = None
+        self._last_fsync = time.monotonic()
+
+    def start(self):
+        if SAVE_CSV or self.state:
+            self._task = asyncio.create_task(self._run())
+
+    def put(self, row: List[str], attempts: int = 0):
+        if self._task:
+            self._queue.put_nowait((row, attempts))
+
+    async def close(self):
+        if self._task:
+            self._queue.put_nowait(None)
+            await self._task
+            self._task = None
+
+    def _write_batch(self, batch: List[Tuple[List[str], int]], fsync: bool):
+        if self.state and batch:
+            # row: [timestamp, address, status, message, proxy, ip]
+            self.state.record_many([(r[1], r[2], n, r[3], r[0]) for r, n in batch])
+        if not SAVE_CSV:
+            return
+        rows = [r for r, _ in batch]
+        if self._f is None:
+            new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            self._f = open(self.path, "a", newline="", encoding="utf-8")
+            if new and self.fmt == "csv":
+                csv.writer(self._f).writerow(RESULT_FIELDS)
+        if self.fmt == "jsonl":
+            self._f.writelines(json.dumps(dict(zip(RESULT_FIELDS, r)), ensure_ascii=False) + "\n" for r in rows)
+        else:
+            csv.writer(self._f).writerows(rows)
+        self._f.flush()
+        if fsync:
+            os.fsync(self._f.fileno())
+
+    async def _run(self):
+        stop = False
+        try:
+            while not stop:
+                batch = []
+                row = await self._queue.get()
+                if self._queue.qsize() < RESULT_BATCH_SIZE and row is not None:
+                    await asyncio.sleep(RESULT_FLUSH_S)  # kasih waktu row lain ikut batch
+                while row is not None:
+                    batch.append(row)
+                    if len(batch) >= RESULT_BATCH_SIZE or self._queue.empty():
+                        break
+                    row = self._queue.get_nowait()
+                stop = row is None
+                now = time.monotonic()
+                fsync = stop or now - self._last_fsync >= RESULT_FSYNC_S
+                if fsync:
+                    self._last_fsync = now
+                if batch or fsync:
+                    await asyncio.to_thread(self._write_batch, batch, fsync)
+        finally:
+            if self._f:
+                try:
+                    self._f.close()
+                except Exception:
+                    pass
+                self._f = None
+
+# ===== Process reclamation =====
+# Switch penanda di cmdline Chromium (diabaikan Chromium) supaya proses browser
+# run ini bisa dicari & di-kill kalau close() nyangkut.
+RUN_MARKER = f"--mova-faucet-run={os.getpid()}-{int(time.time())}"
+
+def _process_table() -> Dict[int, Tuple[int, List[str]]]:
+    """pid → (ppid, cmdline). psutil kalau ada, fallback /proc (Linux)."""
+    table: Dict[int, Tuple[int, List[str]]] = {}
+    if psutil is not None:
+        for p in psutil.process_iter(["pid", "ppid", "cmdline"]):
+            try:
+                table[p.info["pid"]] = (p.info["ppid"] or 0, p.info["cmdline"] or [])
+            except Exception:
+                continue
+        return table
+    try:
+        pids = [int(d) for d in os.listdir("/proc") if d.isdigit()]
+    except OSError:
+        return table
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat", "r") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                cmd = [a.decode(errors="replace") for a in f.read().split(b"\0") if a]
+            table[pid] = (ppid, cmd)
+        except (OSError, IndexError, ValueError):
+            continue
+    return table
+
+def kill_marked_processes(match) -> int:
+    """SIGKILL semua proses yang cmdline-nya cocok match(arg) + seluruh turunannya."""
+    table = _process_table()
+    roots = [pid for pid, (_, cmd) in table.items() if any(match(a) for a in cmd)]
+    children: Dict[int, List[int]] = {}
+    for pid, (ppid, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+    victims, stack = set(), list(roots)
+    while stack:
+        pid = stack.pop()
+        if pid in victims or pid == os.getpid():
+            continue
+        victims.add(pid)
+        stack.extend(children.get(pid, []))
+    killed = 0
+    for pid in victims:
+        try:
+            os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+            killed += 1
+        except OSError:
+            pass
+    return killed
+
+async def close_quietly(obj, timeout: float = CLEANUP_TIMEOUT_S) -> bool:
+    """close() dengan batas waktu. True kalau beres, False kalau error/nyangkut."""
+    try:
+        await asyncio.wait_for(obj.close(), timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+class Supervisor:
+    """Catat context yang dipegang tiap address selama diproses.
+
+    Kalau watchdog nembak dan cleanup di process_address gak sempat jalan,
+    reclaim() nutup context-nya dengan batas waktu; kalau nyangkut, browser
+    pemiliknya di-retire (close bounded → kill process tree).
+    """
+
+    def __init__(self):
+        self._owned: Dict[str, Tuple[BrowserContext, "PooledBrowser"]] = {}
+
+    def track(self, owner: str, context: BrowserContext, lease: "PooledBrowser"):
+        self._owned[owner] = (context, lease)
+
+    def untrack(self, owner: str):
+        self._owned.pop(owner, None)
+
+    async def reclaim(self, pool: "BrowserPool", owner: str):
+        item = self._owned.pop(owner, None)
+        if item is None:
+            return
+        context, lease = item
+        ok = await close_quietly(context)
+        METRICS.inc("reclaimed_contexts" if ok else "stuck_contexts")
+        dlog(f"[supervisor] context {'closed' if ok else 'STUCK'} after watchdog", WARN, owner)
+        if lease.holder == owner:
+            await pool.release(lease, broken=not ok)
+
+    async def final_sweep(self) -> int:
+        """Setelah pool ditutup: kill sisa proses Chromium run ini (= leak)."""
+        n = await asyncio.to_thread(kill_marked_processes, lambda a: a == RUN_MARKER or a.startswith(RUN_MARKER + "."))
+        if n:
+            METRICS.inc("leaked_processes_killed", n)
+        return n
+
+SUPERVISOR = Supervisor()
+
+# ===== Browser pool =====
+LAUNCH_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--disable-dev-shm-usage",
+    "--no-sandbox",
+]
+
+@dataclass
+class PooledBrowser:
+    slot: int
+    browser: Optional[Browser] = None
+    contexts_served: int = 0
+    launched_at: float = 0.0
+    generation: int = 0
+    holder: Optional[str] = None       # address yang lagi minjam
+
+    @property
+    def marker(self) -> str:
+        return f"{RUN_MARKER}.{self.slot}.{self.generation}"
+
+class BrowserPool:
+    """Set browser tetap (ukuran = BROWSER_POOL_SIZE) yang dipinjam per address.
+
+    Browser di-launch lazy saat pertama dipinjam, dicek sehat (masih connected)
+    setiap acquire, dan di-recycle setelah BROWSER_RECYCLE_CONTEXTS context atau
+    BROWSER_RECYCLE_S detik supaya memory leak Chromium gak numpuk.
+    Slot idle dipinjam LIFO: browser yang baru dibalikin dipakai lagi duluan, jadi
+    slot baru cuma di-launch kalau concurrency memang naik.
+    """
+
+    def __init__(self, pw, size: int):
+        self.pw = pw
+        self.size = max(1, size)
+        self._slots = [PooledBrowser(slot=i) for i in range(self.size)]
+        self._idle: asyncio.LifoQueue = asyncio.LifoQueue()
+        for pb in reversed(self._slots):  # slot #0 di atas stack
+            self._idle.put_nowait(pb)
+
+    async def _launch(self, pb: PooledBrowser):
+        # Penting: aktifkan mode per-context proxy saat LAUNCH
+        pb.generation += 1
+        pb.browser = await self.pw.chromium.launch(
+            headless=HEADLESS,
+            proxy={"server": "http://per-context"},   # wajib untuk per-context proxy
+            args=LAUNCH_ARGS + [pb.marker],
+        )
+        pb.contexts_served = 0
+        pb.launched_at = time.time()
+        dlog(f"[pool] browser #{pb.slot} launched")
+
+    async def _retire(self, pb: PooledBrowser, reason: str):
+        if pb.browser is None:
+            return
+        dlog(f"[pool] browser #{pb.slot} retired ({reason}, {pb.contexts_served} contexts)")
+        browser, pb.browser = pb.browser, None
+        if not await close_quietly(browser):
+            marker = pb.marker
+            n = await asyncio.to_thread(kill_marked_processes, lambda a: a == marker)
+            METRICS.inc("browsers_killed")
+            dlog(f"[pool] browser #{pb.slot} close() stuck → killed {n} processes", WARN)
+
+    def _needs_recycle(self, pb: PooledBrowser) -> bool:
+        return (pb.contexts_served >= BROWSER_RECYCLE_CONTEXTS
+                or time.time() - pb.launched_at >= BROWSER_RECYCLE_S)
+
+    async def acquire(self, holder: str = "") -> PooledBrowser:
+        pb = await self._idle.get()
+        try:
+            if pb.browser is not None and not pb.browser.is_connected():
+                await self._retire(pb, "disconnected")
+            elif pb.browser is not None and self._needs_recycle(pb):
+                await self._retire(pb, "recycle")
+            if pb.browser is None:
+                await self._launch(pb)
+        except BaseException:
+            self._idle.put_nowait(pb)
+            raise
+        pb.contexts_served += 1
+        pb.holder = holder
+        return pb
+
+    async def release(self, pb: PooledBrowser, broken: bool = False):
+        if pb.holder is None:
+            return  # sudah dibalikin (process_address vs supervisor)
+        pb.holder = None
+        try:
+            if broken:
+                await self._retire(pb, "broken")
+        finally:
+            self._idle.put_nowait(pb)
+
+    async def close(self):
+        for pb in self._slots:
+            await self._retire(pb, "shutdown")
+
+# ===== Resource policy =====
+def site_of(host: str) -> str:
+    """Domain situs kasar (2 label terakhir); IP/localhost apa adanya."""
+    if not host or host.replace(".", "").isdigit() or "." not in host:
+        return host
+    return ".".join(host.split(".")[-2:])
+
+def host_matches(host: str, suffix: str) -> bool:
+    return host == suffix or host.endswith("." + suffix)
+
+class ResourcePolicy:
+    """Route handler per context: abort tipe resource berat & domain pihak ketiga.
+
+    Dokumen utama selalu lolos; request yang lolos di-fallback() ke handler
+    berikutnya (atau diteruskan ke jaringan).
+    """
+
+    def __init__(self, faucet_url: str = FAUCET_URL):
+        self.site = site_of(urlsplit(faucet_url).hostname or "")
+
+    def allows(self, resource_type: str, url: str) -> bool:
+        if resource_type == "document":
+            return True
+        if resource_type in BLOCK_RESOURCE_TYPES:
+            return False
+        if BLOCK_THIRD_PARTY:
+            host = (urlsplit(url).hostname or "").lower()
+            if host and not host_matches(host, self.site) \
+                    and not any(host_matches(host, d) for d in RESOURCE_ALLOWLIST):
+                return False
+        return True
+
+    async def handle(self, route):
+        req = route.request
+        try:
+            if self.allows(req.resource_type, req.url):
+                await route.fallback()
+            else:
+                METRICS.inc("blocked_requests")
+                await route.abort("blockedbyclient")
+        except PWError:
+            pass  # page/context sudah ditutup
+
+    async def install(self, context: BrowserContext):
+        await context.route("**/*", self.handle)
+
+RESOURCE_POLICY = ResourcePolicy()
+
+# ===== Asset cache =====
+# Header yang gak ikut disimpan: body sudah di-decode Playwright / hop-by-hop
+ASSET_SKIP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection",
+                      "keep-alive", "set-cookie", "date", "age"}
+
+def cache_ttl(headers: Dict[str, str]) -> Optional[int]:
+    """TTL (detik) dari Cache-Control; None = jangan disimpan, 0 = wajib revalidate."""
+    cc = {}
+    for part in (headers.get("cache-control") or "").lower().split(","):
+        k, _, v = part.strip().partition("=")
+        if k:
+            cc[k] = v.strip('"')
+    if "no-store" in cc:
+        return None
+    has_validator = bool(headers.get("etag") or headers.get("last-modified"))
+    if "no-cache" in cc:
+        return 0 if has_validator else None
+    try:
+        if "max-age" in cc:
+            return max(0, int(cc["max-age"]))
+    except ValueError:
+        pass
+    return 0 if has_validator else None
+
+@dataclass
+class AssetEntry:
+    sha256: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    headers: Dict[str, str]
+    expires_at: float
+
+class AssetCache:
+    """Cache aset statis content-addressed di disk, di-serve lewat route.fulfill().
+
+    Index (url → sha256, ETag, expiry) di SQLite; body disimpan sekali per
+    sha256. Entry segar langsung dilayani dari disk, entry basi di-revalidate
+    pakai If-None-Match/If-Modified-Since, dan total ukuran dijaga LRU.
+    """
+
+    def __init__(self, root: str = ASSET_CACHE_DIR, max_bytes: int = ASSET_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._total = 0
+
+    def _open(self):
+        if self._db is not None:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(self.root, "index.sqlite"), check_same_thread=False)
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS assets ("
+                " url TEXT PRIMARY KEY,"
+                " sha256 TEXT NOT NULL,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " headers TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_assets_access ON assets(last_access)")
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM assets").fetchone()[0]
+
+    def _blob_path(self, sha: str) -> str:
+        return os.path.join(self.root, sha[:2], sha)
+
+    def _lookup(self, url: str) -> Optional[Tuple[AssetEntry, bytes]]:
+        with self._lock:
+            self._open()
+            row = self._db.execute(
+                "SELECT sha256, etag, last_modified, headers, expires_at FROM assets WHERE url = ?",
+                (url,)).fetchone()
+            if row is None:
+                return None
+            try:
+                with open(self._blob_path(row[0]), "rb") as f:
+                    body = f.read()
+            except OSError:
+                self._drop(url, row[0])
+                return None
+            with self._db:
+                self._db.execute("UPDATE assets SET last_access = ? WHERE url = ?", (time.time(), url))
+        return AssetEntry(row[0], row[1], row[2], json.loads(row[3]), row[4]), body
+
+    def _refresh(self, url: str, ttl: int):
+        with self._lock, self._db:
+            self._db.execute("UPDATE assets SET expires_at = ? WHERE url = ?", (time.time() + ttl, url))
+
+    def _store(self, url: str, body: bytes, headers: Dict[str, str], ttl: int):
+        sha = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(sha)
+        keep = {k: v for k, v in headers.items() if k.lower() not in ASSET_SKIP_HEADERS}
+        with self._lock:
+            self._open()
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(body)
+                os.replace(tmp, path)
+            old = self._db.execute("SELECT sha256, size FROM assets WHERE url = ?", (url,)).fetchone()
+            now = time.time()
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO assets"
+                    " (url, sha256, etag, last_modified, headers, size, expires_at, last_access)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url, sha, headers.get("etag"), headers.get("last-modified"), json.dumps(keep),
+                     len(body), now + ttl, now))
+            self._total += len(body) - (old[1] if old else 0)
+            if old and old[0] != sha:
+                self._gc_blob(old[0])
+            self._evict()
+
+    def _drop(self, url: str, sha: str):
+        row = self._db.execute("SELECT size FROM assets WHERE url = ?", (url,)).fetchone()
+        with self._db:
+            self._db.execute("DELETE FROM assets WHERE url = ?", (url,))
+        if row:
+            self._total -= row[0]
+        self._gc_blob(sha)
+
+    def _gc_blob(self, sha: str):
+        # blob bisa dipakai beberapa URL (content-addressed)
+        if self._db.execute("SELECT 1 FROM assets WHERE sha256 = ? LIMIT 1", (sha,)).fetchone():
+            return
+        try:
+            os.remove(self._blob_path(sha))
+        except OSError:
+            pass
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        for url, sha in self._db.execute("SELECT url, sha256 FROM assets ORDER BY last_access").fetchall():
+            if self._total <= target:
+                break
+            self._drop(url, sha)
+            METRICS.inc("asset_cache_evictions")
+
+    async def handle(self, route):
+        req = route.request
+        if req.method != "GET" or req.resource_type not in ASSET_CACHE_TYPES:
+            await route.fallback()
+            return
+        url = req.url
+        try:
+            hit = await asyncio.to_thread(self._lookup, url)
+            if hit and hit[0].expires_at > time.time():
+                METRICS.inc("asset_cache_hits")
+                await route.fulfill(status=200, headers=hit[0].headers, body=hit[1])
+                return
 
-async def make_context(pw, proxy: ProxyConf):
-    """Launch browser in per-context proxy mode, then apply real proxy on context."""
-    # Penting: aktifkan mode per-context proxy saat LAUNCH
-    browser = await pw.chromium.launch(
-        headless=HEADLESS,
-        proxy={"server": "http://per-context"},   # wajib untuk per-context proxy
-        args=[
-            "--disable-blink-features=AutomationControlled",
-            "--disable-dev-shm-usage",
-            "--no-sandbox",
-        ],
-    )
-    context = await browser.new_context(
-        proxy={
-            "server": proxy.server,
-            "username": proxy.username,
-            "password": proxy.password
-        } if proxy else None,
-        viewport={"width": 1280, "height": 800},
-    )
-    return browser, context
+            headers = dict(req.headers)
+            if hit and hit[0].etag:
+                headers["if-none-match"] = hit[0].etag
+            if hit and hit[0].last_modified:
+                headers["if-modified-since"] = hit[0].last_modified
+            try:
+                resp = await route.fetch(headers=headers)
+            except PWError as e:
+                # reset/DNS/proxy error upstream → serahkan ke jalur normal, jangan digantung
+                dlog(f"  - Asset fetch failed ({url}): {e}", DEBUG)
+                METRICS.inc("asset_cache_fetch_errors")
+                await route.fallback()
+                return
+
+            if resp.status == 304 and hit:
+                METRICS.inc("asset_cache_revalidated")
+                await asyncio.to_thread(self._refresh, url, cache_ttl(resp.headers) or 0)
+                await route.fulfill(status=200, headers=hit[0].headers, body=hit[1])
+                return
+
+            METRICS.inc("asset_cache_misses")
+            body = await resp.body()
+            ttl = cache_ttl(resp.headers)
+            if resp.status == 200 and ttl is not None:
+                await asyncio.to_thread(self._store, url, body, resp.headers, ttl)
+            await route.fulfill(response=resp, body=body)
+        except PWError:
+            pass  # page/context sudah ditutup
+        except Exception as e:
+            dlog(f"  - Asset cache error ({url}): {type(e).__name__}: {e}", WARN)
+            try:
+                await route.fallback()
+            except Exception:
+                pass
+
+    async def install(self, context: BrowserContext):
+        await context.route("**/*", self.handle)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+ASSET_CACHE = AssetCache()
+
+async def make_context(pool: BrowserPool, proxy: ProxyConf, owner: str) -> Tuple[PooledBrowser, BrowserContext]:
+    """Pinjam browser dari pool, lalu apply real proxy di context baru."""
+    lease = await pool.acquire(owner)
+    try:
+        context = await lease.browser.new_context(
+            proxy={
+                "server": proxy.server,
+                "username": proxy.username,
+                "password": proxy.password
+            } if proxy else None,
+            viewport={"width": 1280, "height": 800},
+        )
+    except BaseException:
+        # termasuk CancelledError dari watchdog: lease belum di-track SUPERVISOR,
+        # jadi kalau gak dibalikin di sini slot-nya nyangkut selamanya
+        await pool.release(lease, broken=True)
+        raise
+    try:
+        # Handler yang didaftar terakhir jalan duluan: policy → (fallback) → cache
+        if CACHE_ASSETS:
+            await ASSET_CACHE.install(context)
+        if BLOCK_RESOURCES:
+            await RESOURCE_POLICY.install(context)
+    except BaseException:
+        ok = await close_quietly(context)
+        await pool.release(lease, broken=not ok)
+        raise
+    SUPERVISOR.track(owner, context, lease)
+    return lease, context
 
 async def proxy_sanity_check(context: BrowserContext, address: str, proxy: ProxyConf) -> Tuple[bool, str]:
     """Cek IP via proxy. Kalau gagal, tandai proxy_failed."""
-    dlog(f"[{address}] Checking proxy connectivity via {proxy.server} ...")
+    dlog(f"Checking proxy connectivity via {proxy.server} ...")
     ip = await get_public_ip_via_context(context)
     if not ip:
-        dlog(f"[{address}] Proxy check FAILED (no IP)")
+        dlog("Proxy check FAILED (no IP)", WARN)
         return False, ""
-    dlog(f"[{address}] Proxy OK, IP={ip}")
+    dlog(f"Proxy OK, IP={ip}")
     return True, ip
 
-async def process_address(pw, address: str, proxy: ProxyConf, writer: Optional[csv.writer]):
-    browser = None
+async def process_address(pool: BrowserPool, address: str, proxy: Optional[ProxyConf], sink: ResultSink,
+                          ctl: ConcurrencyController):
+    lease = None
     context = None
+    page = None
     status, message, ip_info = "error", "uninitialized", ""
+    attempts = 0
+    t_start = time.perf_counter()
+    proxy_label = proxy.server if proxy else "direct"
+    log_token = LOG_ADDRESS.set(address)
 
     try:
         pad()  # jarak antar akun
-        dlog(f"[{address}] ===== START (proxy {proxy.server}) =====")
-        browser, context = await make_context(pw, proxy)
+        dlog(f"===== START (proxy {proxy_label}) =====")
+        with METRICS.span("context"):
+            lease, context = await make_context(pool, proxy, address)
 
         # Cek proxy dulu supaya gak nyangkut di goto()
-        ok, ip = await proxy_sanity_check(context, address, proxy)
-        ip_info = ip
-        if not ok:
-            status, message = "proxy_failed", "Cannot fetch IP via proxy"
-            raise RuntimeError(message)
+        if proxy:
+            with METRICS.span("proxy_check"):
+                ok, ip = await proxy_sanity_check(context, address, proxy)
+            ip_info = ip
+            if not ok:
+                status, message = "proxy_failed", "Cannot fetch IP via proxy"
+                raise RuntimeError(message)
 
         # Klaim
         for attempt in range(1, RETRIES + 1):
-            dlog(f"[{address}] Attempt {attempt}/{RETRIES}")
-            status, message = await claim_once(context, address)
+            dlog(f"Attempt {attempt}/{RETRIES}")
+            attempts = attempt
+            t0 = time.monotonic()
+            # page crash / target closed → buka page baru, jangan goto di page mati
+            fresh = page is None or page.is_closed() or not RETRY_REUSE_PAGE
+            if fresh:
+                if page:
+                    await close_quietly(page)
+                page = await open_claim_page(context, address)
+            status, message = await claim_once(page, address, fresh=fresh)
+            latency = time.monotonic() - t0
+            METRICS.observe("attempt", latency)
+            await ctl.on_result(status, latency)
+            METRICS.set_gauge("concurrency_limit", ctl.limit)
             if status in ("success", "already", "captcha"):
                 break
             if status == "rate_limited":
-                sleep_s = 8 + attempt * 4
-                dlog(f"[{address}] Rate limited, retry in {sleep_s}s")
-                await asyncio.sleep(sleep_s)
+                # cooldown global (semua worker), bukan sleep per address
+                dlog("Rate limited, waiting global cooldown")
+                await ctl.wait_cooldown()
                 continue
             # retry umum
             await asyncio.sleep(2 + attempt)
 
         pad()
-        dlog(f"[{address}] RESULT: {status} — {message}")
+        dlog(f"RESULT: {status} — {message}")
         ts = datetime.utcnow().isoformat()
-        row = [ts, address, status, message, f"{proxy.server}", ip_info]
-        if SAVE_CSV and writer:
-            writer.writerow(row)
+        row = [ts, address, status, message, proxy_label, ip_info]
+        sink.put(row, attempts)
+        METRICS.count_status(status)
 
     except Exception as e:
         ts = datetime.utcnow().isoformat()
         status, message = "error", f"{type(e).__name__}: {e}"
-        dlog(f"[{address}] ERROR: {message}")
-        if SAVE_CSV and writer:
-            writer.writerow([ts, address, status, message, f"{proxy.server}", ip_info])
+        dlog(f"ERROR: {message}", ERROR)
+        sink.put([ts, address, status, message, proxy_label, ip_info], attempts)
+        METRICS.count_status(status)
     finally:
-        if context:
-            try:
-                await context.close()
-            except Exception:
-                pass
-        if browser:
-            try:
-                await browser.close()
-            except Exception:
-                pass
+        closed = True
+        try:
+            if page:
+                await close_quietly(page)
+            if context:
+                closed = await close_quietly(context)
+                SUPERVISOR.untrack(address)
+        finally:
+            if lease:
+                # browser balik ke pool, bukan ditutup (kecuali context-nya nyangkut)
+                await pool.release(lease, broken=not closed)
+            METRICS.observe("address", time.perf_counter() - t_start)
         pad()
-        dlog(f"[{address}] ===== END =====")
+        dlog("===== END =====")
+        LOG_ADDRESS.reset(log_token)
 
 async def main():
     banner()
@@ -410,60 +1652,117 @@ async def main():
 
     ensure_outdir()
 
-    address = load_lines("address.txt")
-    proxies_raw = load_lines("proxies.txt")
+    proxies_raw = load_lines(PROXIES_FILE)
+
+    # Validasi streaming: address.txt gak ditampung di memory
+    n_addr = 0
+    bad = []
+    for a in iter_lines(ADDRESS_FILE):
+        n_addr += 1
+        if not validate_address(a):
+            bad.append(a)
 
-    if not address:
-        dlog("address.txt kosong / tidak ada.")
+    if not n_addr:
+        dlog(f"{ADDRESS_FILE} kosong / tidak ada.")
         sys.exit(1)
-    if not proxies_raw:
-        dlog("proxies.txt kosong / tidak ada.")
+    if USE_PROXY and not proxies_raw:
+        dlog(f"{PROXIES_FILE} kosong / tidak ada.")
         sys.exit(1)
 
-    bad = [a for a in address if not validate_address(a)]
     if bad:
         dlog("Address invalid:")
         for a in bad:
             dlog(f" - {a}")
         sys.exit(1)
 
-    proxies = [parse_proxy_url(p) for p in proxies_raw]
-    def pick_proxy(i: int) -> ProxyConf:
-        return proxies[i % len(proxies)]
+    proxies = [parse_proxy_url(p) for p in proxies_raw] if USE_PROXY else []
+    def pick_proxy(i: int) -> Optional[ProxyConf]:
+        return proxies[i % len(proxies)] if proxies else None
 
-    sem = asyncio.Semaphore(CONCURRENCY)
+    dlog(f"{n_addr} address, concurrency {CONCURRENCY} (adaptif {CONCURRENCY_MIN}-{CONCURRENCY_MAX})")
+    ctl = ConcurrencyController()
+    state = StateStore(STATE_DB)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
 
     async with async_playwright() as pw:
-        async def worker(i_addr: int, addr: str):
-            async with sem:
-                # watchdog per address supaya ga hang
-                async def _run():
-                    f = None
-                    writer = None
-                    try:
-                        if SAVE_CSV:
-                            f = open(RESULT_CSV, "a", newline="", encoding="utf-8")
-                            writer = csv.writer(f)
-                        await process_address(pw, addr, pick_proxy(i_addr), writer)
-                    finally:
-                        if f:
-                            try: f.close()
-                            except Exception: pass
+        pool = BrowserPool(pw, BROWSER_POOL_SIZE)
+        sink = ResultSink(state=state)
+        sink.start()
+        exporter = asyncio.create_task(metrics_exporter())
 
+        async def producer():
+            skipped = 0
+            chunk: List[Tuple[int, str]] = []
+
+            async def flush():
+                nonlocal skipped
+                done = set()
+                if RESUME:
+                    done = await asyncio.to_thread(state.done_among, [a for _, a in chunk])
+                for i, addr in chunk:
+                    if addr.lower() in done:
+                        skipped += 1
+                        continue
+                    await queue.put((i, addr))
+                chunk.clear()
+
+            for item in enumerate(iter_lines(ADDRESS_FILE)):
+                chunk.append(item)
+                if len(chunk) >= RESUME_LOOKUP_BATCH:
+                    await flush()
+            await flush()
+            if skipped:
+                dlog(f"Resume: {skipped} address sudah selesai sebelumnya, di-skip")
+            for _ in range(CONCURRENCY_MAX):
+                await queue.put(None)  # sinyal stop per worker
+
+        async def handle(i_addr: int, addr: str):
+            # watchdog per address supaya ga hang
+            try:
+                await asyncio.wait_for(process_address(pool, addr, pick_proxy(i_addr), sink, ctl),
+                                       timeout=TASK_WATCHDOG_S)
+            except asyncio.TimeoutError:
+                ts = datetime.utcnow().isoformat()
+                msg = f"Task exceeded {TASK_WATCHDOG_S}s watchdog"
+                dlog(f"WATCHDOG TIMEOUT — {msg}", WARN, addr)
+                await SUPERVISOR.reclaim(pool, addr)
+                sink.put([ts, addr, "timeout", msg, pick_proxy(i_addr).server if proxies else "direct", ""], 1)
+                METRICS.count_status("timeout")
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                await ctl.acquire()
                 try:
-                    await asyncio.wait_for(_run(), timeout=TASK_WATCHDOG_S)
-                except asyncio.TimeoutError:
-                    ts = datetime.utcnow().isoformat()
-                    msg = f"Task exceeded {TASK_WATCHDOG_S}s watchdog"
-                    dlog(f"[{addr}] WATCHDOG TIMEOUT — {msg}")
-                    if SAVE_CSV:
-                        with open(RESULT_CSV, "a", newline="", encoding="utf-8") as f:
-                            csv.writer(f).writerow([ts, addr, "timeout", msg, f"{pick_proxy(i_addr).server}", ""])
-
-        tasks = [asyncio.create_task(worker(i, addr)) for i, addr in enumerate(address)]
-        await asyncio.gather(*tasks)
+                    await handle(*item)
+                finally:
+                    await ctl.release()
+
+        try:
+            await asyncio.gather(producer(), *(worker() for _ in range(CONCURRENCY_MAX)))
+        finally:
+            await pool.close()
+            leaked = await SUPERVISOR.final_sweep()
+            c = METRICS.counters
+            dlog(f"Cleanup: {c['reclaimed_contexts']} context reclaimed after watchdog, "
+                 f"{c['stuck_contexts']} stuck, {c['browsers_killed']} browser force-killed, "
+                 f"{leaked} leaked process(es) killed at exit")
+            await sink.close()
+            state.close()
+            ASSET_CACHE.close()
+            exporter.cancel()
+            try:
+                METRICS.write_prometheus()
+                METRICS.write_summary()
+                dlog(f"Metrics: {METRICS_SUMMARY_FILE}, {METRICS_PROM_FILE}")
+            except OSError as e:
+                dlog(f"Metrics export failed: {e}", WARN)
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(state_cli(sys.argv[1:]))
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -1,39 +1,255 @@
 # wallet_gen.py — Generate EVM wallets
 # Save private keys to pvkey.txt, addresses to address.txt
+# - Generate paralel di process pool (semua core), hasil per chunk
+# - Urutan output gak tergantung jumlah worker
+# - Benchmark keys/detik: python walletgen.py bench
+# - Ditulis streaming per chunk ke pvkey.txt & address.txt (selalu sejajar);
+#   kalau crash, run berikutnya lanjut dari chunk terakhir yang lengkap
+# - Mode HD: python walletgen.py hd → satu mnemonic (mnemonic.txt), address
+#   diturunkan per index BIP-44; private key gak ditulis ke file
 
 from web3 import Web3
 from eth_account import Account
+from eth_account.hdaccount import Language, generate_mnemonic, seed_from_mnemonic
+from eth_account.hdaccount.deterministic import Node, SoftNode, derive_child_key
+from eth_keys.datatypes import PrivateKey
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+import hashlib
+import hmac
+import json
 import os
+import sys
+import time
 
 # Jumlah wallet yang mau dibuat
 NUM_WALLETS = 10000
 
 PVKEY_FILE = "pvkey.txt"
 ADDR_FILE = "address.txt"
+STATE_FILE = "walletgen.state.json"        # progress run (hapus otomatis kalau selesai)
+
+WORKERS = int(os.getenv("WORKERS") or 0) or (os.cpu_count() or 1)
+CHUNK_SIZE = 500                           # wallet per task worker
+SEED = os.getenv("WALLETGEN_SEED")         # opsional: key = f(seed, index), reproducible
+BENCH_WALLETS = 2000                       # jumlah wallet per ukuran worker saat bench
+
+# Mode HD (BIP-44): key = derive(mnemonic, HD_PATH.format(index))
+MNEMONIC_FILE = "mnemonic.txt"
+HD_PATH = "m/44'/60'/0'/0/{}"
+HD_WRITE_ADDRESSES = True                  # False = cuma bikin mnemonic, address diturunkan nanti
+
+SECP256K1_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+
+def seeded_key(seed: str, index: int) -> bytes:
+    """Private key deterministik dari (seed, index); rehash kalau di luar range kurva."""
+    ctr = 0
+    while True:
+        k = hashlib.sha256(f"{seed}:{index}:{ctr}".encode()).digest()
+        if 0 < int.from_bytes(k, "big") < SECP256K1_N:
+            return k
+        ctr += 1
+
+def hd_parent_node(seed: bytes) -> Tuple[bytes, bytes, bytes]:
+    """(key, chain_code, pubkey) node HD_PATH tanpa index terakhir (m/44'/60'/0'/0).
+
+    Diturunkan sekali per seed; per index tinggal satu langkah soft child."""
+    main = hmac.new(b"Bitcoin seed", seed, hashlib.sha512).digest()
+    key, chain_code = main[:32], main[32:]
+    for part in HD_PATH.rsplit("/", 1)[0].split("/")[1:]:
+        key, chain_code = derive_child_key(key, chain_code, Node.decode(part))
+    return key, chain_code, PrivateKey(key).public_key.to_compressed_bytes()
+
+def hd_child_key(parent: Tuple[bytes, bytes, bytes], index: int) -> bytes:
+    """Private key HD_PATH.format(index) dari node parent (BIP-32 CKDpriv, soft)."""
+    key, chain_code, pub = parent
+    i = hmac.new(chain_code, pub + index.to_bytes(4, "big"), hashlib.sha512).digest()
+    il = int.from_bytes(i[:32], "big")
+    k = (il + int.from_bytes(key, "big")) % SECP256K1_N
+    if il >= SECP256K1_N or k == 0:
+        # peluang < 2**-127; serahkan ke eth_account (lompat ke index berikutnya)
+        return derive_child_key(key, chain_code, SoftNode(index))[0]
+    return k.to_bytes(32, "big")
+
+def gen_chunk(task: Tuple[int, int, Optional[str], Optional[str]]) -> List[Tuple[str, str]]:
+    """Worker: generate wallet index [start, start+n) → [(pvkey_hex, address)]."""
+    start, n, seed, hd_seed = task
+    parent = hd_parent_node(bytes.fromhex(hd_seed)) if hd_seed else None
+    out = []
+    for i in range(start, start + n):
+        if parent is not None:
+            acct = Account.from_key(hd_child_key(parent, i))
+        elif seed is not None:
+            acct = Account.from_key(seeded_key(seed, i))
+        else:
+            acct = Account.create()  # bikin wallet random
+        out.append((acct.key.hex(), acct.address))
+    return out
+
+def generate(num: int, workers: int = WORKERS, chunk_size: int = CHUNK_SIZE,
+             seed: Optional[str] = SEED, start: int = 0,
+             hd_seed: Optional[str] = None) -> Iterator[List[Tuple[str, str]]]:
+    """Yield hasil per chunk (index start..num) sesuai urutan, berapapun jumlah worker.
+
+    Task di-submit bertahap (maks 2x worker yang lagi jalan), jadi memory gak
+    tumbuh ikut num.
+    """
+    tasks = ((s, min(chunk_size, num - s), seed, hd_seed) for s in range(start, num, chunk_size))
+    if workers <= 1:
+        for t in tasks:
+            yield gen_chunk(t)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        inflight = deque()
+        for t in tasks:
+            inflight.append(ex.submit(gen_chunk, t))
+            if len(inflight) >= workers * 2:
+                yield inflight.popleft().result()
+        while inflight:
+            yield inflight.popleft().result()
+
+class ChunkWriter:
+    """Tulis pvkey & address per chunk (flush + fsync dua-duanya), lalu catat
+    progress ke STATE_FILE. Resume = truncate kedua file ke ukuran chunk
+    lengkap terakhir, jadi baris keduanya selalu sejajar.
+
+    write_keys=False (mode HD): cuma address.txt yang ditulis.
+    """
+
+    def __init__(self, target: int, write_keys: bool = True):
+        mode = "keys" if write_keys else "hd"
+        self.state = self._load_state()
+        if self.state and self.state.get("done", 0) < self.state.get("target", 0):
+            if self.state.get("mode", "keys") != mode:
+                raise SystemExit(f"{STATE_FILE}: run mode '{self.state.get('mode', 'keys')}' belum selesai; "
+                                 f"lanjutkan dulu atau hapus file state-nya.")
+            print(f"[i] Resume: {self.state['done']}/{self.state['target']} wallets sudah ditulis")
+            for path, key in ((PVKEY_FILE, "pvkey_size"), (ADDR_FILE, "addr_size")):
+                if write_keys or path == ADDR_FILE:
+                    with open(path, "a") as f:
+                        f.truncate(self.state[key])  # buang chunk yang setengah jadi
+        else:
+            self.state = {"target": target, "done": 0, "mode": mode,
+                          "pvkey_size": self._size(PVKEY_FILE), "addr_size": self._size(ADDR_FILE)}
+            self._save_state()
+        self.fk = open(PVKEY_FILE, "a") if write_keys else None
+        self.fa = open(ADDR_FILE, "a")
+
+    @staticmethod
+    def _size(path: str) -> int:
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    @staticmethod
+    def _load_state() -> Optional[dict]:
+        try:
+            with open(STATE_FILE, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_state(self):
+        tmp = STATE_FILE + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, STATE_FILE)
+
+    @property
+    def target(self) -> int:
+        return self.state["target"]
+
+    @property
+    def done(self) -> int:
+        return self.state["done"]
+
+    def write_chunk(self, chunk: List[Tuple[str, str]]):
+        if self.fk:
+            self.fk.write("".join(k + "\n" for k, _ in chunk))
+        self.fa.write("".join(a + "\n" for _, a in chunk))
+        for f in (self.fk, self.fa):
+            if f:
+                f.flush()
+                os.fsync(f.fileno())
+        self.state["done"] += len(chunk)
+        if self.fk:
+            self.state["pvkey_size"] = self.fk.tell()
+        self.state["addr_size"] = self.fa.tell()
+        self._save_state()
+
+    def close(self):
+        if self.fk:
+            self.fk.close()
+        self.fa.close()
+        if self.done >= self.target:
+            os.remove(STATE_FILE)
+
+def progress(done: int, total: int, t0: float, base: int = 0):
+    rate = (done - base) / max(time.time() - t0, 1e-9)
+    print(f"\r[{done}/{total}] {rate:,.0f} keys/s", end="", flush=True)
+
+def bench():
+    counts = sorted({1, 2, 4, 8, WORKERS} & set(range(1, WORKERS + 1)))
+    print(f"Benchmark {BENCH_WALLETS} wallets")
+    for w in counts:
+        chunk = max(50, min(CHUNK_SIZE, BENCH_WALLETS // (w * 4)))  # cukup chunk buat semua worker
+        t0 = time.time()
+        n = sum(len(c) for c in generate(BENCH_WALLETS, workers=w, chunk_size=chunk))
+        dt = time.time() - t0
+        print(f"  workers={w:<3} {n / dt:>10,.0f} keys/s  ({dt:.2f}s)")
 
 def main():
-    pvkeys = []
-    addrs = []
-
-    for i in range(NUM_WALLETS):
-        acct = Account.create()  # bikin wallet random
-        pvkeys.append(acct.key.hex())
-        addrs.append(acct.address)
-        print(f"[{i+1}] {acct.address}  |  {acct.key.hex()}")
-
-    # Simpan private keys
-    with open(PVKEY_FILE, "a") as f:
-        for k in pvkeys:
-            f.write(k + "\n")
-
-    # Simpan addresses
-    with open(ADDR_FILE, "a") as f:
-        for a in addrs:
-            f.write(a + "\n")
-
-    print(f"\n✅ Done! {NUM_WALLETS} wallets generated.")
+    writer = ChunkWriter(NUM_WALLETS)
+    try:
+        t0 = time.time()
+        start = writer.done
+        for chunk in generate(writer.target, start=start):
+            writer.write_chunk(chunk)
+            progress(writer.done, writer.target, t0, base=start)
+        print()
+    finally:
+        writer.close()
+
+    print(f"\n✅ Done! {writer.target} wallets generated.")
     print(f"Private keys saved to {PVKEY_FILE}")
     print(f"Addresses saved to {ADDR_FILE}")
 
+def load_or_create_mnemonic() -> str:
+    if os.path.exists(MNEMONIC_FILE):
+        with open(MNEMONIC_FILE, "r") as f:
+            return f.read().strip()
+    words = generate_mnemonic(num_words=24, lang=Language.ENGLISH)
+    with open(MNEMONIC_FILE, "w") as f:
+        f.write(words + "\n")
+    print(f"[i] Mnemonic baru disimpan ke {MNEMONIC_FILE} — SIMPAN BAIK-BAIK")
+    return words
+
+def hd_main():
+    words = load_or_create_mnemonic()
+    if not HD_WRITE_ADDRESSES:
+        print(f"✅ HD seed siap di {MNEMONIC_FILE}; address diturunkan per index (HD_PATH {HD_PATH}).")
+        return
+    hd_seed = seed_from_mnemonic(words, "").hex()
+    writer = ChunkWriter(NUM_WALLETS, write_keys=False)
+    try:
+        t0 = time.time()
+        start = writer.done
+        for chunk in generate(writer.target, start=start, hd_seed=hd_seed):
+            writer.write_chunk(chunk)
+            progress(writer.done, writer.target, t0, base=start)
+        print()
+    finally:
+        writer.close()
+
+    print(f"\n✅ Done! {writer.target} HD addresses (index 0..{writer.target - 1}).")
+    print(f"Mnemonic: {MNEMONIC_FILE}")
+    print(f"Addresses saved to {ADDR_FILE}")
+
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:2] == ["bench"]:
+        bench()
+    elif sys.argv[1:2] == ["hd"]:
+        hd_main()
+    else:
+        main()